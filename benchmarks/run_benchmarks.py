@@ -0,0 +1,301 @@
+# Name   : run_benchmarks.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Benchmarks of the post-processing chain on synthetic Lethe data (see synthetic_lethe_data.py).
+#          For each mesh size and grid, the synthetic file is generated once in benchmarks/work/lethe_data/ and the
+#          following stages are timed, in the order of the chain:
+#            * extraction: lethe_data_extraction_all_data of lethe_data_extraction.py on the .csv file,
+#            * near_wall_extraction: the reading of the lower wall data of mesh_quality.py,
+#            * wall_nearest: the search of the wall-nearest point of each x (near_wall.py),
+#            * y_plus: the x+, y+ and z+ of mesh_quality.py,
+#            * reattachment: the reattachment point of near_wall_processing_new.py,
+#            * spanwise_chunks: the spanwise-averaged field of the file computed by chunks,
+#            * spanwise_averaging: the spanwise-averaged field of the file (spanwise_field.py),
+#            * extraction_field: lethe_data_extraction_all_data reading the spanwise-averaged field,
+#            * statistics: obtain_data and calculate_statistics of
+#              scripts/extract_information_data_with_geometry_baseline.py,
+#            * figure: obtain_data and plot_onto_geometry of scripts/plot_data_with_geometry_baseline.py.
+#          The functions are taken from the scripts (their code before the last line of #, without the calls), with the
+#          variables of the scripts set to the synthetic case, and run in benchmarks/work/<grid>_<size>/. Each stage is
+#          run repeats times (the outputs of the previous run are removed first, so the extractions are not skipped as
+#          up to date) and the minimum and median times are kept. The results are saved in
+#          benchmarks/results/<date>.json and compared to the baseline (benchmarks/results/baseline.json): a stage
+#          slower than the baseline by more than regression_threshold is reported as a regression (and the script exits
+#          with an error).
+#
+#          To run the benchmarks:            python benchmarks/run_benchmarks.py 120K 1M --grid adaptive --repeats 3
+#          To save the results as baseline:  python benchmarks/run_benchmarks.py 120K 1M --save-baseline
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from spanwise_field import build_spanwise_field
+from synthetic_lethe_data import option_argument, synthetic_lethe_file, synthetic_meshes
+
+########################################################################################################################
+# SET VARIABLES
+
+# Mesh sizes (of synthetic_meshes) and grids benchmarked by default
+benchmark_sizes = ["120K", "1M"]
+benchmark_grids = ["structured"]
+
+# Number of runs of each stage
+repeats = 3
+
+# Folders of the repository, of the synthetic cases and of the results
+repository_folder = Path(__file__).resolve().parents[1]
+work_folder = Path(__file__).resolve().parent / "work"
+results_folder = Path(__file__).resolve().parent / "results"
+baseline_file = results_folder / "baseline.json"
+
+# Relative slowdown (minimum time compared to the baseline) reported as a regression, if the stage is also slower by
+# more than regression_minimum (s), since the times of the fastest stages vary more than this threshold
+regression_threshold = 0.25
+regression_minimum = 0.01
+
+# Reynolds number and kinematic viscosity of the synthetic cases
+Re = 5600
+viscosity = 1.78571E-04
+
+# x/h, data types, labels and scale factors of the extractions, statistics and figures
+x_available = [0.05, 0.5, 1, 2, 3, 4, 5, 6, 7, 8]
+data_type_available = ["average_velocity_0", "reynolds_normal_stress_0", "reynolds_shear_stress_uv"]
+x_labels_available = ["$u/u_b$", "$u'u'/u_b^2$", "$u'v'/u_b^2$"]
+scale_available = [0.8, 5, 10]
+
+########################################################################################################################
+
+
+# Change the working directory to folder (created if needed) in a with statement
+@contextlib.contextmanager
+def working_directory(folder):
+    previous = os.getcwd()
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    os.chdir(folder)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# Functions and variables of a script of the repository, without running it
+# The code before the last line of # of the script (the variables and the functions) is run in the current working
+# directory, then the variables of the script are replaced by variables
+def load_script(script, variables):
+    script = repository_folder / script
+    lines = script.read_text().splitlines(keepends=True)
+    last_banner = max(i for i, line in enumerate(lines) if line.strip() and set(line.strip()) == {"#"})
+
+    namespace = {"__name__": script.stem, "__file__": str(script)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(compile("".join(lines[:last_banner]), str(script), "exec"), namespace)
+    namespace.update(variables)
+    return namespace
+
+
+# Time run (after setup, which is not timed) repeats times, the output of run being discarded
+# Returns the list of times (s)
+def time_stage(run, setup=None, repeats=3):
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+    return times
+
+
+# Extract the literature profiles of the synthetic cases to output_csv/literature/<Re>/ of the working directory
+def extract_literature():
+    literature = load_script("literature_data_extraction.py",
+                             {"path_to_literature_data": str(repository_folder / "lit" / ("Re_" + str(Re))) + "/",
+                              "folder_to_save_csv": "./output_csv/literature/" + str(Re) + "/"})
+    profiles = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for x_value in x_available:
+            for data_type in data_type_available:
+                literature["literature_data_extraction"](x_value, data_type, literature["path_to_literature_data"],
+                                                         profiles, Re)
+    literature["write_profiles"](literature["folder_to_save_csv"], profiles)
+
+
+# Stages of the benchmark of a synthetic file, run in the order of the list in the working directory
+# Returns a list of (name, setup, run)
+def case_stages(lethe_csv):
+    path_to_lethe_data = str(lethe_csv.parent) + "/"
+    file_names_lethe_data = [lethe_csv.stem]
+    labels = ["Lethe - " + lethe_csv.stem]
+    variables = {"Re": Re, "viscosity": viscosity, "path_to_lethe_data": path_to_lethe_data,
+                 "file_names_lethe_data": file_names_lethe_data, "labels": labels, "jobs": 1}
+    extraction = load_script("lethe_data_extraction.py", variables)
+    mesh_quality = load_script("mesh_quality.py", variables)
+    near_wall_processing = load_script("near_wall_processing_new.py", variables)
+    wall_data = []
+
+    # The extractions start from the .csv file (no cache, no spanwise-averaged field, no extracted profile)
+    def remove_lethe_outputs():
+        shutil.rmtree(lethe_csv.parent / (lethe_csv.stem + "_cache"), ignore_errors=True)
+        (lethe_csv.parent / (lethe_csv.stem + "_spanwise_field.npz")).unlink(missing_ok=True)
+        remove_profiles()
+
+    def remove_profiles():
+        for name in ["profiles.npz", "extraction_manifest.json"]:
+            (Path(extraction["folder_to_save_csv"]) / name).unlink(missing_ok=True)
+
+    def extract_profiles():
+        extraction["lethe_data_extraction_all_data"](x_available, data_type_available, path_to_lethe_data,
+                                                     file_names_lethe_data, Re)
+
+    def extract_near_wall():
+        wall_data[:] = mesh_quality["lethe_data_extraction"](path_to_lethe_data, file_names_lethe_data, Re)
+
+    return [("extraction", remove_lethe_outputs, extract_profiles),
+            ("near_wall_extraction", remove_lethe_outputs, extract_near_wall),
+            ("wall_nearest", None, lambda: mesh_quality["wall_nearest_point_average"](wall_data[0])),
+            ("y_plus", None, lambda: mesh_quality["y_plus"](wall_data, viscosity, mesh_quality["folder_to_save_csv"])),
+            ("reattachment", None, lambda: near_wall_processing["reattachment"](wall_data, labels)),
+            ("spanwise_chunks", remove_lethe_outputs, lambda: build_spanwise_field(lethe_csv, streaming=True)),
+            ("spanwise_averaging", remove_lethe_outputs, lambda: build_spanwise_field(lethe_csv)),
+            ("extraction_field", remove_profiles, extract_profiles)]
+
+
+# Stages of the benchmark of the statistics and figures of the profiles extracted from a synthetic file, run in the
+# order of the list in the scripts folder of the working directory
+# Returns a list of (name, setup, run)
+def script_stages(lethe_csv):
+    variables = {"Re": Re, "file_names_lethe_data": [lethe_csv.stem], "labels": ["Lethe - " + lethe_csv.stem],
+                 "all_data": True}
+    information = load_script("scripts/extract_information_data_with_geometry_baseline.py", variables)
+    figure = load_script("scripts/plot_data_with_geometry_baseline.py", variables)
+    x_vector_hill, y_bottom_hill, y_top_hill = figure["hill_geometry"]()
+
+    def calculate_statistics():
+        for data_type, x_label, scale in zip(data_type_available, x_labels_available, scale_available):
+            all_x_data = information["obtain_data"](x_available, information["path_to_lethe_data"],
+                                                    information["file_names_lethe_data"], data_type,
+                                                    information["path_to_literature_data"])
+            information["calculate_statistics"](x_available, Re, all_x_data, information["path_to_save"], scale,
+                                                information["labels"], x_label, data_type)
+
+    def plot_figures():
+        for data_type, x_label, scale in zip(data_type_available, x_labels_available, scale_available):
+            all_x_data = figure["obtain_data"](x_available, figure["path_to_lethe_data"],
+                                               figure["file_names_lethe_data"], data_type,
+                                               figure["path_to_literature_data"])
+            figure["plot_onto_geometry"](x_available, Re, all_x_data, figure["path_to_save"], x_vector_hill,
+                                         y_bottom_hill, y_top_hill, scale, figure["labels"], x_label,
+                                         figure["display_title"], data_type)
+
+    return [("statistics", None, calculate_statistics), ("figure", None, plot_figures)]
+
+
+# Run the stages of a list of (name, setup, run) for a synthetic file, a stage that fails being recorded with its error
+# Returns a list of results
+def run_stages(stages, lethe_csv, size, grid, repeats):
+    results = []
+    for name, setup, run in stages:
+        result = {"name": name, "size": size, "grid": grid, "rows": synthetic_rows(lethe_csv)}
+        try:
+            times = time_stage(run, setup, repeats)
+            result.update({"times": times, "min": min(times), "median": statistics.median(times)})
+            print(f"{name:<22} {grid:<10} {size:>5} {min(times):10.4f} s (median {statistics.median(times):.4f} s)")
+        except Exception as error:
+            result["error"] = type(error).__name__ + ": " + str(error)
+            print(f"{name:<22} {grid:<10} {size:>5} failed ({result['error'][:80]})")
+        results.append(result)
+
+    return results
+
+
+# Number of points of a synthetic file
+def synthetic_rows(lethe_csv):
+    with open(lethe_csv, "rb") as file:
+        return sum(block.count(b"\n") for block in iter(lambda: file.read(1 << 24), b"")) - 1
+
+
+# Run the benchmarks of sizes and grids
+# Returns the results with a description of the machine
+def run_benchmarks(sizes, grids, repeats=3):
+    results = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": platform.node(), "platform": platform.platform(),
+               "processor": platform.processor(), "cpus": os.cpu_count(), "python": platform.python_version(),
+               "numpy": numpy.__version__, "repeats": repeats, "benchmarks": []}
+
+    for grid in grids:
+        for size in sizes:
+            lethe_csv = synthetic_lethe_file(work_folder / "lethe_data", size, grid, Re).resolve()
+            case_folder = work_folder / (grid + "_" + size)
+            with working_directory(case_folder):
+                extract_literature()
+                results["benchmarks"] += run_stages(case_stages(lethe_csv), lethe_csv, size, grid, repeats)
+            with working_directory(case_folder / "scripts"):
+                results["benchmarks"] += run_stages(script_stages(lethe_csv), lethe_csv, size, grid, repeats)
+
+    return results
+
+
+# Compare results to baseline (results of a previous run)
+# Returns the list of the benchmarks slower than the baseline by more than threshold (and by more than minimum seconds)
+def compare_to_baseline(results, baseline, threshold=0.25, minimum=0.01):
+    baseline_times = {(result["name"], result["grid"], result["size"]): result["min"]
+                      for result in baseline["benchmarks"] if "min" in result}
+    regressions = []
+    print("Comparison to the baseline of " + baseline["date"] + " (" + baseline["machine"] + ")")
+    for result in results["benchmarks"]:
+        key = (result["name"], result["grid"], result["size"])
+        if "min" not in result or key not in baseline_times:
+            continue
+
+        ratio = result["min"] / baseline_times[key]
+        regression = ratio > 1 + threshold and result["min"] - baseline_times[key] > minimum
+        print(f"{key[0]:<22} {key[1]:<10} {key[2]:>5} {result['min']:10.4f} s {baseline_times[key]:10.4f} s "
+              f"{ratio:6.2f}x" + ("  REGRESSION" if regression else ""))
+        if regression:
+            regressions.append(dict(result, baseline=baseline_times[key], ratio=ratio))
+
+    return regressions
+
+
+# Save results to a .json file
+def save_results(results, results_file):
+    Path(results_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(results_file, "w") as file:
+        json.dump(results, file, indent=2)
+    print("Results saved in " + str(results_file))
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    # Figures are saved without being displayed
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    sizes = [argument for argument in sys.argv[1:] if argument in synthetic_meshes] or benchmark_sizes
+    grids = option_argument("--grid", ",".join(benchmark_grids)).split(",")
+    repeats = int(option_argument("--repeats", repeats))
+    baseline_file = Path(option_argument("--baseline", baseline_file))
+
+    results = run_benchmarks(sizes, grids, repeats)
+    save_results(results, results_folder / (time.strftime("%Y%m%d_%H%M%S") + ".json"))
+
+    if "--save-baseline" in sys.argv[1:]:
+        save_results(results, baseline_file)
+    elif baseline_file.is_file():
+        with open(baseline_file) as file:
+            regressions = compare_to_baseline(results, json.load(file), regression_threshold,
+                                              regression_minimum)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,90 @@
+# Name   : coordinate_binning.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Quantization of the coordinates of the Lethe data into integer bin keys.
+#          The points of the same grid line (x plane, y value of a plane, z plane) can have coordinates that differ by a
+#          round-off error when they were written by different processes, so they are grouped by bins instead of exact
+#          equality of the floats. The sorted values of a coordinate start a new bin where they are more than tolerance
+#          apart from the previous value, and each value is given the int64 key of its bin, the bins being numbered in
+#          increasing order. The value of a bin is its smallest value. When the spacing of the mesh is known (for
+#          example the z planes of a structured mesh), the key is the index of the closest plane,
+#          round((value - origin) / spacing), which does not sort the values.
+#          Several coordinates (for example (x, y)) are combined into a single int64 key, so the points are grouped by
+#          sorting integers instead of rows of floats.
+
+import numpy
+
+# Largest difference (x/h, y/h, z/h) between two coordinates of the same grid line
+coordinate_tolerance = 1e-9
+
+
+# Bins of the coordinate values within tolerance of each other, or of the planes spaced by spacing from origin
+# Returns the value of each bin (sorted) and the int64 key of the bin of each value (index in the bin values)
+def coordinate_bins(values, tolerance=coordinate_tolerance, spacing=None, origin=0.0):
+    values = numpy.asarray(values, dtype=float).ravel()
+    if len(values) == 0:
+        return numpy.empty(0), numpy.empty(0, dtype=numpy.int64)
+
+    if spacing is not None:
+        assert spacing > 2 * tolerance, "The spacing must be larger than twice the tolerance."
+        planes = numpy.rint((values - origin) / spacing).astype(numpy.int64)
+        keys = planes - planes.min()
+
+        # The value of a bin is its smallest value, the planes without values are at their exact position
+        bins = numpy.full(keys.max() + 1, numpy.inf)
+        numpy.minimum.at(bins, keys, values)
+        empty = numpy.isinf(bins)
+        bins[empty] = origin + (numpy.flatnonzero(empty) + planes.min()) * spacing
+        return bins, keys
+
+    order = numpy.argsort(values, kind="stable")
+    sorted_values = values[order]
+    new_bin = numpy.ones(len(values), dtype=bool)
+    new_bin[1:] = numpy.diff(sorted_values) > tolerance
+
+    keys = numpy.empty(len(values), dtype=numpy.int64)
+    keys[order] = numpy.cumsum(new_bin) - 1
+    return sorted_values[new_bin], keys
+
+
+# Group the rows of coordinates (an array of n values, or of n rows of values grouped together, for example (x, y)
+# pairs) whose values are in the same bins, as numpy.unique with axis=0
+# spacing is None (bins within tolerance) or the spacing of the planes of each column (None for the columns binned with
+# tolerance)
+# Returns the unique rows (the smallest values of their rows) sorted by the first column then the next ones, the index
+# of the unique row of each row and the number of rows of each unique row
+def coordinate_groups(coordinates, tolerance=coordinate_tolerance, spacing=None):
+    coordinates = numpy.asarray(coordinates, dtype=float)
+    columns = coordinates.reshape(len(coordinates), -1)
+    spacing = spacing if spacing is not None else [None] * columns.shape[1]
+    assert len(spacing) == columns.shape[1], "The spacing must be given for each column of coordinates."
+
+    # Combine the keys of the columns into one key per row, in the order of the columns
+    keys = numpy.zeros(len(columns), dtype=numpy.int64)
+    n_keys = 1
+    for k in range(columns.shape[1]):
+        bins, bin_keys = coordinate_bins(columns[:, k], tolerance, spacing[k])
+        n_keys *= max(len(bins), 1)
+        assert n_keys < 2 ** 62, "There are too many bins to combine the coordinates in a single key."
+        keys = keys * len(bins) + bin_keys
+
+    _, inverse, counts = numpy.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    # The value of a unique row is the smallest value of its rows in each column (the bin of a coordinate can contain
+    # values of other unique rows, for example the y values of another x plane)
+    unique_rows = numpy.full((len(counts), columns.shape[1]), numpy.inf)
+    for k in range(columns.shape[1]):
+        numpy.minimum.at(unique_rows[:, k], inverse, columns[:, k])
+    if coordinates.ndim == 1:
+        unique_rows = unique_rows[:, 0]
+
+    return unique_rows, inverse, counts
+
+
+# Index of the bin of the sorted bin values within tolerance of value, None if there is none
+def matching_bin(bins, value, tolerance=coordinate_tolerance):
+    position = numpy.searchsorted(bins, value - tolerance)
+    if position < len(bins) and abs(bins[position] - value) <= tolerance:
+        return int(position)
+    return None
@@ -0,0 +1,106 @@
+# Name   : extraction_manifest.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Manifest of the Lethe profiles extracted in an output folder, for incremental extractions.
+#          For each profile of the store of the folder (see profile_store.py), indexed by (Lethe file, data type, x/h),
+#          the manifest (extraction_manifest.json) records the size, modification time and sha256 hash of the Lethe
+#          .csv file and the parameters of the extraction (Reynolds number, tolerance of the stations, tolerance of the
+#          coordinates). When lethe_data_extraction.py runs again, only the profiles that are missing or whose file or
+#          parameters changed are extracted, so adding a mesh to a study only extracts the new mesh.
+#          The hash of a file is only computed again when its size or modification time changed, so a file that was
+#          copied or touched without being modified is not extracted again.
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from profile_store import read_profiles
+
+# Version of the manifest layout (and of the extraction), manifests written with another version are ignored
+# Version 2: the points are grouped by bins of coordinate_tolerance instead of exact equality of their coordinates
+manifest_version = 2
+
+# Name of the manifest in each output folder
+manifest_name = "extraction_manifest.json"
+
+# Size of the blocks read to hash a file (bytes)
+hash_block_size = 1 << 24
+
+
+# Load the manifest of folder, an empty manifest if it does not exist or was written with another version
+def read_extraction_manifest(folder):
+    manifest_file = Path(folder) / manifest_name
+    if not manifest_file.is_file():
+        return {"version": manifest_version, "files": {}, "products": {}}
+
+    with open(manifest_file) as file:
+        manifest = json.load(file)
+    if manifest.get("version") != manifest_version:
+        return {"version": manifest_version, "files": {}, "products": {}}
+
+    return manifest
+
+
+# Save the manifest of folder
+def write_extraction_manifest(folder, manifest):
+    # Write to a temporary file and rename it, so an interrupted write never corrupts the manifest
+    manifest_file = Path(folder) / manifest_name
+    temporary_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    with open(temporary_file, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary_file, manifest_file)
+
+
+# Size, modification time and sha256 hash of a file
+# The hash of previous (the fingerprint recorded in the manifest) is reused if the size and modification time are the
+# same
+def file_fingerprint(path, previous=None):
+    source = os.stat(path)
+    if previous is not None and previous["size"] == source.st_size and previous["mtime_ns"] == source.st_mtime_ns:
+        return previous
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(hash_block_size), b""):
+            sha256.update(block)
+
+    return {"size": source.st_size, "mtime_ns": source.st_mtime_ns, "sha256": sha256.hexdigest()}
+
+
+# Key of a product (a profile of a Lethe file) in the manifest
+def product_key(file_name, data_type, x_value):
+    return str(file_name) + "|" + str(data_type) + "|" + repr(float(x_value))
+
+
+# Products (x_value, data_type) of a Lethe file that must be extracted: the products that are not in the store of
+# folder, or that were extracted from another content of lethe_csv or with other parameters
+def stale_products(folder, lethe_csv, file_name, products, parameters):
+    manifest = read_extraction_manifest(folder)
+    profiles, _ = read_profiles(folder)
+    fingerprint = file_fingerprint(lethe_csv, manifest["files"].get(str(file_name)))
+
+    stale = []
+    for x_value, data_type in products:
+        recorded = manifest["products"].get(product_key(file_name, data_type, x_value))
+        if (("Lethe", str(file_name), str(data_type), float(x_value)) not in profiles or recorded is None
+                or recorded["sha256"] != fingerprint["sha256"] or recorded["parameters"] != parameters):
+            stale.append((x_value, data_type))
+
+    # Keep the new size and modification time of the file, so it is not hashed again
+    if manifest["files"].get(str(file_name)) != fingerprint:
+        manifest["files"][str(file_name)] = fingerprint
+        write_extraction_manifest(folder, manifest)
+
+    return stale
+
+
+# Record the products (x_value, data_type) of a Lethe file extracted from lethe_csv with parameters
+def record_products(folder, lethe_csv, file_name, products, parameters):
+    manifest = read_extraction_manifest(folder)
+    fingerprint = file_fingerprint(lethe_csv, manifest["files"].get(str(file_name)))
+    manifest["files"][str(file_name)] = fingerprint
+    for x_value, data_type in products:
+        manifest["products"][product_key(file_name, data_type, x_value)] = {"sha256": fingerprint["sha256"],
+                                                                            "parameters": parameters}
+    write_extraction_manifest(folder, manifest)
@@ -0,0 +1,94 @@
+# Name   : hill_geometry.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Lower wall geometry of the periodic hills (Breuer et al. 2009, alpha = 1) evaluated for whole numpy arrays.
+#          The hill is defined by 6 cubic polynomials in a domain where the hill height is H = 28. The right hill is
+#          the mirror image of the left hill (x -> 252 - x). All the functions take and return values scaled with the
+#          hill height (x/h, y/h), as the Lethe data.
+
+from functools import lru_cache
+
+import numpy
+
+# Hill height and length of the domain used to define the polynomials
+H = 28.0
+max_x = 9 * H
+
+# Height of the channel (y/h)
+channel_height = 3.035
+
+# Bounds of the polynomials of the left hill, the hill is flat (y = 0) after the last bound
+breakpoints = numpy.array([9.0, 14.0, 20.0, 30.0, 40.0, 54.0])
+
+# Polynomial coefficients [a, b, c, d] of y = a + b*x + c*x^2 + d*x^3 in each interval
+coefficients = numpy.array([
+    [2.800000000000E+01, 0.000000000000E+00, 6.775070969851E-03, -2.124527775800E-03],
+    [2.507355893131E+01, 9.754803562315E-01, -1.016116352781E-01, 1.889794677828E-03],
+    [2.579601052357E+01, 8.206693007457E-01, -9.055370274339E-02, 1.626510569859E-03],
+    [4.046435022819E+01, -1.379581654948E+00, 1.945884504128E-02, -2.070318932190E-04],
+    [1.792461334664E+01, 8.743920332081E-01, -5.567361123058E-02, 6.277731764683E-04],
+    [5.639011190988E+01, -2.010520359035E+00, 1.644919857549E-02, 2.674976141766E-05],
+    [0.0, 0.0, 0.0, 0.0],
+])
+
+
+# Height of the left hill and its derivative at distances x (scaled with H = 28) from the crest of the closest hill
+def _left_hill(x):
+    interval = numpy.searchsorted(breakpoints, x, side="right")
+    a, b, c, d = coefficients[interval].T
+
+    y = a + b * x + c * x ** 2 + d * x ** 3
+    dy_dx = b + 2 * c * x + 3 * d * x ** 2
+
+    # The first polynomial is capped at the crest (y = H) and the last one at the bottom (y = 0)
+    capped = ((interval == 0) & (y > H)) | ((interval == 5) & (y < 0))
+    y = numpy.where(capped, numpy.clip(y, 0, H), y)
+    dy_dx = numpy.where(capped, 0.0, dy_dx)
+
+    return y, dy_dx
+
+
+# Height and slope of the lower wall at x (x/h, any shape)
+# Returns y/h of the wall and dy/dx at each x
+def wall_height_and_slope(x):
+    x = numpy.clip(numpy.asarray(x, dtype=float) * H, 0, max_x)
+
+    # Distance from the crest of the closest hill, the right hill being the mirror image of the left hill
+    right_hill = x > max_x / 2
+    distance = numpy.where(right_hill, max_x - x, x)
+
+    y, dy_dx = _left_hill(distance)
+
+    return y / H, numpy.where(right_hill, -dy_dx, dy_dx)
+
+
+# Height of the lower wall (y/h) at x (x/h)
+def wall_height(x):
+    return wall_height_and_slope(x)[0]
+
+
+# Slope of the lower wall (dy/dx) at x (x/h)
+def wall_slope(x):
+    return wall_height_and_slope(x)[1]
+
+
+# Unit normal of the lower wall pointing into the fluid at x (x/h)
+# Returns the x and y components of the normal
+def wall_normal(x):
+    dy_dx = wall_slope(x)
+    norm = numpy.sqrt(1 + dy_dx ** 2)
+    return -dy_dx / norm, 1 / norm
+
+
+# Lower and upper walls of the geometry for plotting (x/h, y/h), with num points along the domain
+# The arrays are cached and read-only, since every figure uses the same geometry
+@lru_cache(maxsize=None)
+def hill_geometry(num=100):
+    x_vector = numpy.linspace(0, max_x / H, num)
+    y_bottom = wall_height(x_vector)
+    y_top = channel_height * numpy.ones(num)
+
+    for vector in (x_vector, y_bottom, y_top):
+        vector.setflags(write=False)
+
+    return x_vector, y_bottom, y_top
@@ -0,0 +1,174 @@
+# Name   : lethe_cache.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Columnar binary cache for the Lethe .csv files exported from paraview.
+#          Each .csv file is converted once to a cache folder (lethe_data/<file_name>_cache/) that contains one raw
+#          binary array per numeric column and a manifest.json header (columns, dtypes, number of rows and size and
+#          modification time of the source .csv file). The columns are opened as memory maps, so only the columns used
+#          by a script are read from the disk.
+#          The reading functions are used by all the extraction scripts and fall back to pandas.read_csv when there is
+#          no cache or when the .csv file was modified after the conversion (or to the parallel parser of
+#          parallel_processing.py when several processes are given).
+#
+#          To convert the Lethe data: python lethe_cache.py ./lethe_data/file_name_1.csv ./lethe_data/file_name_2.csv
+
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy
+import pandas
+
+from parallel_processing import read_csv_parallel
+from stage_profiling import profile_stage, profiled_stage
+
+# Version of the cache layout, caches written with another version are considered stale
+cache_version = 1
+
+# Number of rows read from the cache at once by read_lethe_csv
+cache_chunksize = 1000000
+
+
+# Path of the cache folder associated with a Lethe .csv file
+def cache_folder(lethe_csv):
+    lethe_csv = Path(lethe_csv)
+    return lethe_csv.parent / (lethe_csv.stem + "_cache")
+
+
+# Returns the manifest of the cache of lethe_csv if it exists and is up to date with the .csv file, None otherwise
+def read_manifest(lethe_csv):
+    manifest_file = cache_folder(lethe_csv) / "manifest.json"
+    if not manifest_file.is_file():
+        return None
+
+    with open(manifest_file) as file:
+        manifest = json.load(file)
+
+    source = os.stat(lethe_csv)
+    if (manifest["version"] != cache_version or manifest["source_size"] != source.st_size
+            or manifest["source_mtime_ns"] != source.st_mtime_ns):
+        return None
+
+    return manifest
+
+
+# Convert a Lethe .csv file to its columnar binary cache
+# The .csv file is read by chunks, so the conversion does not need to hold the whole file in memory
+@profiled_stage("convert")
+def convert_lethe_csv(lethe_csv, chunksize=100000):
+    folder = cache_folder(lethe_csv)
+    source = os.stat(lethe_csv)
+
+    # Write in a temporary folder and rename it at the end, so an interrupted conversion never looks like a cache
+    temporary_folder = folder.with_name(folder.name + ".tmp")
+    shutil.rmtree(temporary_folder, ignore_errors=True)
+    temporary_folder.mkdir(parents=True)
+
+    columns = None
+    binary_files = []
+    n_rows = 0
+    for chunk in pandas.read_csv(lethe_csv, sep=",", iterator=True, chunksize=chunksize):
+        if columns is None:
+            # Only numeric columns are stored, always as float64 since paraview writes zeros as integers
+            columns = [{"name": name, "file": "column_" + str(i).zfill(3) + ".bin", "dtype": numpy.dtype("float64").str}
+                       for i, name in enumerate(chunk.columns) if pandas.api.types.is_numeric_dtype(chunk[name])]
+            binary_files = [open(temporary_folder / column["file"], "wb") for column in columns]
+
+        for column, binary_file in zip(columns, binary_files):
+            numpy.ascontiguousarray(chunk[column["name"]].to_numpy(dtype=column["dtype"])).tofile(binary_file)
+        n_rows += len(chunk)
+
+    for binary_file in binary_files:
+        binary_file.close()
+
+    manifest = {"version": cache_version, "source": str(Path(lethe_csv).name), "source_size": source.st_size,
+                "source_mtime_ns": source.st_mtime_ns, "n_rows": n_rows, "columns": columns or []}
+    with open(temporary_folder / "manifest.json", "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(temporary_folder, folder)
+    print("Lethe data " + str(lethe_csv) + " converted to cache (" + str(n_rows) + " rows)")
+
+    return manifest
+
+
+# Open the columns of the cache of lethe_csv as read-only memory maps
+# Returns a dictionary {column name: numpy.memmap} in the order of the .csv file (like pandas.read_csv with usecols),
+# or None if the cache is missing, stale or lacks one of the columns
+def open_lethe_columns(lethe_csv, usecols=None):
+    manifest = read_manifest(lethe_csv)
+    if manifest is None:
+        return None
+
+    available = [column["name"] for column in manifest["columns"]]
+    if usecols is None:
+        usecols = available
+    if any(name not in available for name in usecols):
+        return None
+
+    folder = cache_folder(lethe_csv)
+    lethe_columns = {}
+    for column in manifest["columns"]:
+        name = column["name"]
+        if name not in usecols:
+            continue
+        if manifest["n_rows"] == 0:
+            lethe_columns[name] = numpy.empty(0, dtype=column["dtype"])
+        else:
+            lethe_columns[name] = numpy.memmap(folder / column["file"], dtype=column["dtype"], mode="r",
+                                               shape=(manifest["n_rows"],))
+
+    return lethe_columns
+
+
+# Iterate through a Lethe .csv file by chunks of usecols, as pandas.read_csv(..., iterator=True, chunksize=chunksize)
+# The chunks are read from the cache when it is up to date, in which case they have at least cache_chunksize rows
+# Otherwise, with jobs > 1, the .csv file is parsed in parallel by jobs processes (by byte ranges of about chunksize
+# rows, at least minimum_range_size bytes)
+def read_lethe_csv(lethe_csv, usecols, chunksize=10000, jobs=1):
+    lethe_columns = open_lethe_columns(lethe_csv, usecols)
+    if lethe_columns is None and jobs > 1:
+        return read_csv_parallel(lethe_csv, usecols, jobs, chunksize)
+    if lethe_columns is None:
+        return pandas.read_csv(lethe_csv, usecols=usecols, sep=",", iterator=True, chunksize=chunksize)
+
+    return iterate_lethe_columns(lethe_columns, max(chunksize, cache_chunksize))
+
+
+# Iterate by chunks of rows through a dictionary of columns opened with open_lethe_columns
+def iterate_lethe_columns(lethe_columns, chunksize):
+    n_rows = len(next(iter(lethe_columns.values()))) if lethe_columns else 0
+    for start in range(0, n_rows, chunksize):
+        yield pandas.DataFrame({name: numpy.array(column[start:start + chunksize])
+                                for name, column in lethe_columns.items()},
+                               index=pandas.RangeIndex(start, min(start + chunksize, n_rows)))
+
+
+# Read usecols of a whole Lethe .csv file to a Pandas dataframe, from the cache when it is up to date
+# Otherwise, with jobs > 1, the .csv file is parsed in parallel by jobs processes
+def read_lethe_dataframe(lethe_csv, usecols, jobs=1):
+    with profile_stage("read", label=Path(lethe_csv).name) as stage:
+        lethe_columns = open_lethe_columns(lethe_csv, usecols)
+        if lethe_columns is None and jobs > 1:
+            lethe_data = pandas.concat(read_csv_parallel(lethe_csv, usecols, jobs))
+        elif lethe_columns is None:
+            lethe_data = pandas.read_csv(lethe_csv, usecols=usecols, sep=",")
+        else:
+            lethe_data = pandas.DataFrame({name: numpy.array(column) for name, column in lethe_columns.items()})
+        stage["rows"] = len(lethe_data)
+
+    return lethe_data
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    for lethe_csv in [argument for argument in sys.argv[1:] if not argument.startswith("--")]:
+        if read_manifest(lethe_csv) is None:
+            convert_lethe_csv(lethe_csv)
+        else:
+            print("Cache of Lethe data " + str(lethe_csv) + " is up to date")
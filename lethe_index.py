@@ -0,0 +1,136 @@
+# Name   : lethe_index.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Persistent spatial index of a Lethe .csv file, stored in the folder of its binary cache (see lethe_cache.py).
+#          For each coordinate (Points_0, Points_1, Points_2), the index stores the sorted unique values (keys), the
+#          offset of each key in the list of rows sorted by this coordinate, and this list of rows. A query for the
+#          points in a range of x (station) or y (wall band) is then a binary search in the keys and a contiguous slice
+#          of the sorted rows, instead of a scan of the whole file.
+#
+#          To build the index: python lethe_index.py ./lethe_data/file_name_1.csv ./lethe_data/file_name_2.csv
+
+import json
+import sys
+from pathlib import Path
+
+import numpy
+import pandas
+
+from lethe_cache import cache_folder, convert_lethe_csv, open_lethe_columns, read_lethe_csv, read_manifest
+from lethe_zone_map import read_lethe_zones
+from stage_profiling import profile_stage
+
+# Coordinates indexed
+index_columns = ["Points_0", "Points_1", "Points_2"]
+
+
+# Build the index of lethe_csv (and its cache if it is missing or stale)
+def build_lethe_index(lethe_csv):
+    manifest = read_manifest(lethe_csv)
+    if manifest is None:
+        manifest = convert_lethe_csv(lethe_csv)
+
+    folder = cache_folder(lethe_csv)
+    available = [column["name"] for column in manifest["columns"]]
+    indexed = [name for name in index_columns if name in available]
+    lethe_columns = open_lethe_columns(lethe_csv, indexed)
+
+    for name in indexed:
+        values = numpy.asarray(lethe_columns[name])
+        order = numpy.argsort(values, kind="stable")
+        keys, offsets = numpy.unique(values[order], return_index=True)
+        numpy.save(folder / ("index_" + name + "_order.npy"), order)
+        numpy.save(folder / ("index_" + name + "_keys.npy"), keys)
+        numpy.save(folder / ("index_" + name + "_offsets.npy"), numpy.append(offsets, len(values)))
+
+    # The index is written last, so an interrupted build is never used
+    with open(folder / "index.json", "w") as file:
+        json.dump({"n_rows": manifest["n_rows"], "columns": indexed}, file, indent=2)
+    print("Index of Lethe data " + str(lethe_csv) + " built for " + ", ".join(indexed))
+
+
+# Returns the index description of lethe_csv if its cache is up to date and indexed, None otherwise
+def read_lethe_index(lethe_csv):
+    manifest = read_manifest(lethe_csv)
+    index_file = cache_folder(lethe_csv) / "index.json"
+    if manifest is None or not index_file.is_file():
+        return None
+
+    with open(index_file) as file:
+        index = json.load(file)
+
+    if index["n_rows"] != manifest["n_rows"]:
+        return None
+
+    return index
+
+
+# Sorted rows of lethe_csv where lower_bound < column < upper_bound for each (lower_bound, upper_bound) in bounds
+# Returns None if column is not indexed
+def lethe_index_rows(lethe_csv, column, bounds):
+    index = read_lethe_index(lethe_csv)
+    if index is None or column not in index["columns"]:
+        return None
+
+    folder = cache_folder(lethe_csv)
+    keys = numpy.load(folder / ("index_" + column + "_keys.npy"), mmap_mode="r")
+    offsets = numpy.load(folder / ("index_" + column + "_offsets.npy"), mmap_mode="r")
+    order = numpy.load(folder / ("index_" + column + "_order.npy"), mmap_mode="r")
+
+    slices = []
+    for lower_bound, upper_bound in bounds:
+        start = offsets[numpy.searchsorted(keys, lower_bound, side="right")]
+        stop = offsets[numpy.searchsorted(keys, upper_bound, side="left")]
+        if stop > start:
+            slices.append(numpy.asarray(order[start:stop]))
+
+    if not slices:
+        return numpy.empty(0, dtype=numpy.int64)
+
+    # Rows in the order of the file, which also makes the reads of the memory maps sequential
+    return numpy.unique(numpy.concatenate(slices))
+
+
+# Read usecols of the rows of lethe_csv where lower_bound < column < upper_bound for any of the bounds
+# Uses the index when it is available, otherwise iterates through the file by chunks (parsed by jobs processes), only
+# through the blocks that can contain the bounds if the zone map of lethe_csv was built (see lethe_zone_map.py)
+# As pandas.read_csv, the columns of the returned dataframe are in the order of the file
+def read_lethe_range(lethe_csv, usecols, column, bounds, chunksize=10000, jobs=1):
+    with profile_stage("read", label=Path(lethe_csv).name) as stage:
+        rows = lethe_index_rows(lethe_csv, column, bounds)
+
+        if rows is None:
+            lower_bounds = numpy.array([bound[0] for bound in bounds], dtype=float)
+            upper_bounds = numpy.array([bound[1] for bound in bounds], dtype=float)
+            read_columns = list(usecols) if column in usecols else list(usecols) + [column]
+
+            chunks = read_lethe_zones(lethe_csv, read_columns, column, bounds, jobs=jobs)
+            if chunks is None:
+                chunks = read_lethe_csv(lethe_csv, usecols=read_columns, chunksize=chunksize, jobs=jobs)
+
+            lethe_data_chunks = []
+            for chunk in chunks:
+                with profile_stage("filter", rows=len(chunk)):
+                    values = chunk[column].to_numpy()[:, None]
+                    in_range = numpy.any((values > lower_bounds) & (values < upper_bounds), axis=1)
+                    lethe_data_chunks.append(chunk[in_range])
+            lethe_data_range = pandas.concat(lethe_data_chunks)
+            if column not in usecols:
+                lethe_data_range = lethe_data_range.drop(columns=column)
+        else:
+            lethe_columns = open_lethe_columns(lethe_csv, usecols)
+            lethe_data_range = pandas.DataFrame({name: lethe_columns[name][rows] for name in lethe_columns},
+                                                index=rows)
+
+        stage["rows"] = len(lethe_data_range)
+
+    return lethe_data_range
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    for lethe_csv in sys.argv[1:]:
+        if not lethe_csv.startswith("--"):
+            build_lethe_index(lethe_csv)
@@ -0,0 +1,166 @@
+# Name   : lethe_profiles.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Extraction of z-averaged vertical profiles of the Lethe data at any x/h.
+#          lethe_station_extraction averages (or interpolates between the two closest x planes) the points of a range of
+#          x. It is used by lethe_station_profiles (the stations of lethe_data_extraction.py) and by lethe_profile,
+#          which works on the spanwise-averaged 2D field of a Lethe file. This field is read from the field store of
+#          spanwise_field.py when it is built, otherwise it is computed once per file and data types, and kept in
+#          memory with the offset of each x plane, so a profile at any x/h only reads the one or two x planes around
+#          it. This allows dense sets of stations, for example:
+#
+#              for x_value in numpy.arange(0.05, 9, 0.05):
+#                  data, y = lethe_profile("./lethe_data/file_name.csv", x_value, "average_velocity_0")
+
+import os
+
+import numpy
+
+from coordinate_binning import coordinate_bins, matching_bin
+from spanwise_averaging import spanwise_average
+from spanwise_field import compute_spanwise_field, read_averaged_range, read_spanwise_field
+from stage_profiling import profile_stage
+
+# Spanwise-averaged 2D fields already computed, indexed by (lethe_csv, modification time, data types)
+spanwise_averaged_fields = {}
+
+
+# Extraction of z-averaged profiles at x_value from an array whose columns are [x, y, data_type_1, ..., data_type_n]
+# Returns the averaged (or interpolated) data with one column per data type and the corresponding y values
+def lethe_station_extraction(lethe_data_range_array, x_value):
+    # Group the x values by bins of coordinate_tolerance, so the points of a x plane with round-off errors are one plane
+    x_keys, x_index = coordinate_bins(lethe_data_range_array[:, 0])
+    station = matching_bin(x_keys, x_value)
+
+    # If the x_value is exact
+    if station is not None:
+        print("Unique data found for x/h = ", x_value)
+
+        # Find rows which contain x_value
+        station_array = lethe_data_range_array[x_index == station]
+
+        # Average across z values for each unique value of y
+        lethe_data_y, lethe_data_data_type, _ = spanwise_average(station_array[:, 1], station_array[:, 2:])
+        lethe_data_y = lethe_data_y[:, None]
+
+    # If the x_value is not exact, interpolate between values
+    else:
+        with profile_stage("interpolate", rows=len(lethe_data_range_array)):
+            print("No unique data found for x/h = ", x_value, " Interpolating")
+            # Find the x values immediately greater and smaller than x_value (binary search in the sorted unique x
+            # values)
+            position = numpy.searchsorted(x_keys, x_value)
+            just_above_x_value = x_keys[position]
+            just_below_x_value = x_keys[position - 1]
+            print("Interpolation values identified : ", just_below_x_value, "and", just_above_x_value)
+
+            # Upper interpolation values: average data across z values for each unique value of y just above x_value
+            upper_interpolation_matrix = lethe_data_range_array[x_index == position, 1:]
+            lethe_data_upper_y, upper_data_values, _ = spanwise_average(upper_interpolation_matrix[:, 0],
+                                                                        upper_interpolation_matrix[:, 1:])
+            lethe_data_upper_y = lethe_data_upper_y[:, None]
+
+            # Lower interpolation values (as above)
+            lower_interpolation_matrix = lethe_data_range_array[x_index == position - 1, 1:]
+            lethe_data_lower_y, lower_data_values, _ = spanwise_average(lower_interpolation_matrix[:, 0],
+                                                                        lower_interpolation_matrix[:, 1:])
+            lethe_data_lower_y = lethe_data_lower_y[:, None]
+
+            # Prepare for linear interpolation
+            int_fraction = (x_value - just_below_x_value) / (just_above_x_value - just_below_x_value)
+
+            # If static mesh, upper and lower datasets will contain the same number of points. Adaptive meshes may not.
+            if numpy.size(lethe_data_lower_y) == numpy.size(lethe_data_upper_y):
+                lethe_data_data_type = ((upper_data_values - lower_data_values) * int_fraction) + lower_data_values
+                lethe_data_y = ((lethe_data_upper_y - lethe_data_lower_y) * int_fraction) + lethe_data_lower_y
+            else:
+                # Ensure corresponding y values are used in interpolation: each upper y is paired with every lower y
+                # such that lower_y <= upper_y <= lower_y + tol. Since the y values are sorted, these lower y are
+                # contiguous and their first and last indices are found by binary search
+                tol = 0.01
+                upper_y = lethe_data_upper_y[:, 0]
+                lower_y = lethe_data_lower_y[:, 0]
+                first_lower = numpy.searchsorted(lower_y + tol, upper_y, side="left")
+                end_lower = numpy.searchsorted(lower_y, upper_y, side="right")
+                n_pairs = numpy.maximum(end_lower - first_lower, 0)
+
+                # Pairs (upper_index, lower_index) sorted by upper index, then by lower index
+                upper_index = numpy.repeat(numpy.arange(len(upper_y)), n_pairs)
+                lower_index = (numpy.repeat(first_lower, n_pairs) + numpy.arange(n_pairs.sum())
+                               - numpy.repeat(numpy.cumsum(n_pairs) - n_pairs, n_pairs))
+
+                # Linear interpolation : u = (u_2 - u_1) * (x - x_1) / (x2 - x1) + u_1
+                lethe_data_data_type = (((upper_data_values[upper_index] - lower_data_values[lower_index])
+                                         * int_fraction) + lower_data_values[lower_index])
+                lethe_data_y = ((upper_y[upper_index] - lower_y[lower_index]) * int_fraction) + lower_y[lower_index]
+                lethe_data_y = lethe_data_y[:, None]
+
+    return lethe_data_data_type, lethe_data_y
+
+
+# Z-averaged profiles of data_types of lethe_csv at each x_value of x_values, reading once the points in
+# [x_value - tolerance, x_value + tolerance] of every x_value (tolerance set at 0.1 based on spacing in x-values at
+# coarse mesh in initial case)
+# The .csv file is parsed by jobs processes when it is read without cache
+# Returns a list with, for each x_value, the data (one column per data type) and the corresponding y values
+def lethe_station_profiles(lethe_csv, x_values, data_types, tolerance=0.1, jobs=1):
+    lower_bounds = numpy.asarray(x_values, dtype=float) - tolerance
+    upper_bounds = numpy.asarray(x_values, dtype=float) + tolerance
+
+    # Read the required columns in range [lower_bound, upper_bound] of any x_value (from the spanwise-averaged field or
+    # the index of lethe_csv if they were built, otherwise iterating through the file)
+    lethe_data_range = read_averaged_range(lethe_csv, ["Points_0", "Points_1"] + list(data_types), "Points_0",
+                                           list(zip(lower_bounds, upper_bounds)), chunksize=10000, jobs=jobs)
+
+    # Convert Pandas dataframe into numpy array with columns [x, y, data_type_1, ..., data_type_n]
+    lethe_data_range_array = lethe_data_range[["Points_0", "Points_1"] + list(data_types)].to_numpy()
+
+    profiles = []
+    for x_value, lower_bound, upper_bound in zip(x_values, lower_bounds, upper_bounds):
+        # Rows of the current x_value range
+        x_range = (lethe_data_range_array[:, 0] > lower_bound) & (lethe_data_range_array[:, 0] < upper_bound)
+        profiles.append(lethe_station_extraction(lethe_data_range_array[x_range], x_value))
+
+    return profiles
+
+
+# Spanwise-averaged 2D field of the data_types of lethe_csv
+# Returns a dictionary with the x and y values of the field, the z-averaged data and its variance in z (one column per
+# data type) and the number of points averaged, sorted by x then y, and the unique x values (x_keys) with the offset of
+# their first row
+def spanwise_averaged_field(lethe_csv, data_types):
+    stored_field = read_spanwise_field(lethe_csv)
+    if stored_field is not None and all(data_type in stored_field["data_types"] for data_type in data_types):
+        columns = [stored_field["data_types"].index(data_type) for data_type in data_types]
+        field = dict(stored_field, data_types=list(data_types))
+        field["data"] = stored_field["data"][:, columns]
+        field["variance"] = stored_field["variance"][:, columns]
+        return field
+
+    key = (os.path.abspath(lethe_csv), os.stat(lethe_csv).st_mtime_ns, tuple(data_types))
+    if key not in spanwise_averaged_fields:
+        spanwise_averaged_fields[key] = compute_spanwise_field(lethe_csv, data_types)
+    return spanwise_averaged_fields[key]
+
+
+# Z-averaged profile of data_types (a data type or a list of data types) of lethe_csv at any x_value
+# Returns the data with one column per data type and the corresponding y values, as lethe_station_extraction
+def lethe_profile(lethe_csv, x_value, data_types):
+    if isinstance(data_types, str):
+        data_types = [data_types]
+    field = spanwise_averaged_field(lethe_csv, data_types)
+    x_keys = field["x_keys"]
+    x_offsets = field["x_offsets"]
+
+    assert x_keys[0] <= x_value <= x_keys[-1], "x_value must be in the range of x of the Lethe data."
+
+    # Rows of the x plane(s) of the 2D field around x_value
+    station = matching_bin(x_keys, x_value)
+    if station is not None:
+        rows = slice(x_offsets[station], x_offsets[station + 1])
+    else:
+        position = numpy.searchsorted(x_keys, x_value)
+        rows = slice(x_offsets[position - 1], x_offsets[position + 1])
+
+    field_array = numpy.column_stack((field["x"][rows], field["y"][rows], field["data"][rows]))
+    return lethe_station_extraction(field_array, x_value)
@@ -0,0 +1,152 @@
+# Name   : lethe_zone_map.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Zone map of a Lethe .csv file: minimum and maximum of the coordinates (Points_0, Points_1, Points_2) of each
+#          block of rows. The blocks are byte ranges of the .csv file aligned on the lines (zone_size bytes, about 50000
+#          points), and the zone map also stores their first row and number of rows. It is saved next to the .csv file
+#          (lethe_data/<file_name>_zone_map.npz) with the size and modification time of the .csv file.
+#          When a range of x (station) or y (wall band) is read without the index of lethe_index.py, only the blocks
+#          whose minimum and maximum overlap the range are parsed (from the .csv file, or from the cache if it is up to
+#          date) and the other blocks are skipped.
+#
+#          To build the zone maps: python lethe_zone_map.py ./lethe_data/file_name_1.csv ./lethe_data/file_name_2.csv
+#          Add --jobs N to parse the .csv files with N processes.
+
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy
+import pandas
+
+from lethe_cache import open_lethe_columns
+from parallel_processing import csv_byte_ranges, iterate_in_order, jobs_argument, read_csv_byte_range
+
+# Version of the zone map layout, zone maps written with another version are considered stale
+zone_map_version = 1
+
+# Size of the blocks of the zone map (bytes)
+zone_size = 1 << 22
+
+# Coordinates of the zone map
+zone_columns = ["Points_0", "Points_1", "Points_2"]
+
+
+# Path of the zone map associated with a Lethe .csv file
+def zone_map_file(lethe_csv):
+    lethe_csv = Path(lethe_csv)
+    return lethe_csv.parent / (lethe_csv.stem + "_zone_map.npz")
+
+
+# Minimum and maximum of the columns of a block of rows, with the number of rows
+def zone_statistics(chunk):
+    values = chunk.to_numpy(dtype=float)
+    if len(values) == 0:
+        return numpy.full(values.shape[1], numpy.inf), numpy.full(values.shape[1], -numpy.inf), 0
+    return values.min(axis=0), values.max(axis=0), len(values)
+
+
+# Minimum and maximum of usecols in the byte range of csv_file, with the number of rows
+def read_zone_statistics(byte_range, csv_file, names, usecols):
+    return zone_statistics(read_csv_byte_range(byte_range, csv_file, names, usecols))
+
+
+# Build and save the zone map of lethe_csv, parsing its blocks with jobs processes
+def build_zone_map(lethe_csv, jobs=1):
+    source = os.stat(lethe_csv)
+    names = list(pandas.read_csv(lethe_csv, sep=",", nrows=0).columns)
+    columns = [name for name in names if name in zone_columns]
+    byte_ranges = csv_byte_ranges(lethe_csv, range_size=zone_size)
+
+    statistics = list(iterate_in_order(partial(read_zone_statistics, csv_file=lethe_csv, names=names,
+                                               usecols=columns), byte_ranges, jobs))
+    n_rows = numpy.array([n for _, _, n in statistics], dtype=numpy.int64)
+
+    # Write to a temporary file and rename it, so an interrupted build is never used
+    zone_file = zone_map_file(lethe_csv)
+    temporary_file = zone_file.with_name(zone_file.stem + ".tmp.npz")
+    numpy.savez(temporary_file, version=zone_map_version, source_size=source.st_size,
+                source_mtime_ns=source.st_mtime_ns, columns=numpy.array(columns),
+                byte_ranges=numpy.array(byte_ranges, dtype=numpy.int64).reshape(-1, 2),
+                row_starts=numpy.cumsum(n_rows) - n_rows, n_rows=n_rows,
+                minimum=numpy.array([minimum for minimum, _, _ in statistics]).reshape(-1, len(columns)),
+                maximum=numpy.array([maximum for _, maximum, _ in statistics]).reshape(-1, len(columns)))
+    os.replace(temporary_file, zone_file)
+    print("Zone map of Lethe data " + str(lethe_csv) + " built (" + str(len(byte_ranges)) + " blocks)")
+
+
+# Load the zone map of lethe_csv, None if it does not exist or is not up to date with the .csv file
+def read_zone_map(lethe_csv):
+    zone_file = zone_map_file(lethe_csv)
+    if not zone_file.is_file():
+        return None
+
+    with numpy.load(zone_file) as stored:
+        zone_map = {name: stored[name] for name in stored.files}
+    zone_map["columns"] = [str(name) for name in zone_map["columns"]]
+
+    source = os.stat(lethe_csv)
+    if (zone_map["version"] != zone_map_version or zone_map["source_size"] != source.st_size
+            or zone_map["source_mtime_ns"] != source.st_mtime_ns):
+        return None
+
+    return zone_map
+
+
+# Iterate by blocks through usecols of the rows of lethe_csv, skipping the blocks where column cannot be in
+# lower_bound < column < upper_bound for any of the bounds
+# The blocks are read from the cache when it is up to date, otherwise parsed from the .csv file by jobs processes
+# As pandas.read_csv, the columns are in the order of the file and the index is the row number in the file
+# Returns None if there is no zone map of lethe_csv for column
+def read_lethe_zones(lethe_csv, usecols, column, bounds, jobs=1):
+    zone_map = read_zone_map(lethe_csv)
+    if zone_map is None or column not in zone_map["columns"]:
+        return None
+
+    k = zone_map["columns"].index(column)
+    selected = numpy.zeros(len(zone_map["n_rows"]), dtype=bool)
+    for lower_bound, upper_bound in bounds:
+        selected |= (zone_map["minimum"][:, k] < upper_bound) & (zone_map["maximum"][:, k] > lower_bound)
+    selected &= zone_map["n_rows"] > 0
+
+    return iterate_lethe_zones(lethe_csv, usecols, zone_map, numpy.flatnonzero(selected), jobs)
+
+
+# Iterate through usecols of the blocks of the zone map of lethe_csv
+def iterate_lethe_zones(lethe_csv, usecols, zone_map, blocks, jobs):
+    names = list(pandas.read_csv(lethe_csv, sep=",", nrows=0).columns)
+    usecols = [name for name in names if name in usecols]
+
+    # Always yield a block, so the reads can be concatenated when no block is selected
+    if len(blocks) == 0:
+        yield pandas.DataFrame({name: numpy.empty(0) for name in usecols})
+        return
+
+    lethe_columns = open_lethe_columns(lethe_csv, usecols)
+    if lethe_columns is not None:
+        for block in blocks:
+            start = zone_map["row_starts"][block]
+            stop = start + zone_map["n_rows"][block]
+            yield pandas.DataFrame({name: numpy.array(lethe_columns[name][start:stop]) for name in usecols},
+                                   index=pandas.RangeIndex(start, stop))
+        return
+
+    read_block = partial(read_csv_byte_range, csv_file=lethe_csv, names=names, usecols=usecols)
+    byte_ranges = [tuple(zone_map["byte_ranges"][block]) for block in blocks]
+    for block, chunk in zip(blocks, iterate_in_order(read_block, byte_ranges, jobs)):
+        chunk.index = pandas.RangeIndex(zone_map["row_starts"][block], zone_map["row_starts"][block] + len(chunk))
+        yield chunk
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    jobs = jobs_argument(default=1)
+    lethe_csvs = [argument for argument in sys.argv[1:] if argument.endswith(".csv")]
+    for lethe_csv in lethe_csvs:
+        if read_zone_map(lethe_csv) is None:
+            build_zone_map(lethe_csv, jobs)
+        else:
+            print("Zone map of Lethe data " + str(lethe_csv) + " is up to date")
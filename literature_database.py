@@ -0,0 +1,207 @@
+# Name   : literature_database.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Database of the literature data of the periodic hills case (lit/Re_*/).
+#          All the literature files are parsed once and saved in a single file (lit/literature_database.npz) with the
+#          size and modification time of each file, indexed by (Re, source, x/h, data type). Each entry is an array
+#          [data, y/h] of shape (2, n), the data types being the names of the Lethe data. The sources are:
+#            * "Rapp2009" and "Breuer2009": the data used in the comparisons, from the converted UFR 3-30 .csv files
+#              (Rapp2009_UFR3-30/Rapp2009_*.csv and Breuer2009_UFR3-30/Breuer2009_3-30_*.csv), and the reynolds normal
+#              stress w'w' of Breuer2009 from the curves digitized from the paper (Breuer2009/Breuer2009_*.csv),
+#            * "Rapp2009_UFR3-30" and "Breuer2009_UFR3-30": the original ERCOFTAC UFR 3-30 .dat files, at full precision
+#              and with the points inside the hill, read with ufr_dat_reader.py (all the columns of their header),
+#            * "Breuer2009_paper": the curves digitized from the paper. The curves along the wall (x/h on the first
+#              column) have no x/h and their data type is the name of the curve ("Curve25", "Curve26", "Curve27").
+#          The database is loaded once per process and rebuilt when a literature file is added or modified, so the
+#          profiles are read with a dictionary lookup instead of parsing the files for each x/h and data type.
+#
+#          To build the database: python literature_database.py ./lit/
+
+import os
+import sys
+from pathlib import Path
+
+import numpy
+import pandas
+
+from stage_profiling import profiled_stage
+from ufr_dat_reader import read_ufr_dat
+
+# Version of the database layout, databases written with another version are considered stale
+database_version = 1
+
+# Name of the database in the literature folder
+database_name = "literature_database.npz"
+
+# x/h of the files 01 to 10 of the UFR 3-30 data
+literature_stations = [0.05, 0.5, 1, 2, 3, 4, 5, 6, 7, 8]
+
+# Column of each data type in the converted UFR 3-30 .csv files
+literature_fields = {"average_velocity_0": "u/u_b", "average_velocity_1": "v/u_b",
+                     "reynolds_normal_stress_0": "u'u'/u_b^2", "reynolds_normal_stress_1": "v'v'/u_b^2",
+                     "reynolds_shear_stress_uv": "u'v'/u_b^2", "reynolds_normal_stress_2": "w'w'/u_b^2",
+                     "turbulent_kinetic_energy": "k/u_b^2"}
+
+# x/h and data type of the curves digitized from Breuer2009: 6 curves for each x/h
+paper_stations = [0.05, 2, 4, 8]
+paper_fields = ["average_velocity_0", "average_velocity_1", "reynolds_normal_stress_0", "reynolds_normal_stress_1",
+                "reynolds_normal_stress_2", "reynolds_shear_stress_uv"]
+
+# Databases already loaded, indexed by database path: (modification time, database)
+loaded_databases = {}
+
+
+# Literature files of path_to_literature (the files of the Re_* folders), sorted
+def literature_files(path_to_literature):
+    return sorted(path for path in Path(path_to_literature).glob("Re_*/*/*")
+                  if path.suffix in [".csv", ".dat"] and path.is_file())
+
+
+# Reynolds number of a Re_* folder
+def folder_reynolds(folder):
+    return int(Path(folder).name[len("Re_"):])
+
+
+# Number of a literature file, from the end of its name (Rapp2009_02.csv, UFR3-30_X_5600_data_CR-002.dat -> 2)
+def file_number(path):
+    return int(Path(path).stem.replace("-", "_").split("_")[-1])
+
+
+# Parse a literature file
+# Returns a list of ((source, x_value, field), [data, y]) for the profiles of the file
+@profiled_stage("read")
+def parse_literature_file(path):
+    path = Path(path)
+    number = file_number(path)
+    x_value = literature_stations[number - 1] if number <= len(literature_stations) else None
+    parsed = []
+
+    if path.suffix == ".dat":
+        # The x/h is given in the header of the Rapp2009 files, and by the number of the Breuer2009 files
+        source = path.parent.name.split("_")[0]
+        ufr_dat = read_ufr_dat(path)
+        x_value = x_value if ufr_dat["x_value"] is None else ufr_dat["x_value"]
+        for i, field in enumerate(ufr_dat["fields"][1:]):
+            parsed.append(((source + "_UFR3-30", x_value, field), [ufr_dat["data"][:, i + 1], ufr_dat["data"][:, 0]]))
+
+    elif path.parent.name == "Breuer2009":
+        curve = "Curve" + str(number).zfill(2)
+        curve_data = pandas.read_csv(path, usecols=["x", curve], sep=",")
+        profile = [numpy.array(curve_data[curve]), numpy.array(curve_data["x"])]
+        if number <= len(paper_stations) * len(paper_fields):
+            x_value = paper_stations[(number - 1) // len(paper_fields)]
+            field = paper_fields[(number - 1) % len(paper_fields)]
+            parsed.append((("Breuer2009_paper", x_value, field), profile))
+            if field == "reynolds_normal_stress_2":
+                parsed.append((("Breuer2009", x_value, field), profile))
+        else:
+            parsed.append((("Breuer2009_paper", None, curve), profile))
+
+    else:
+        source = path.parent.name.split("_")[0]
+        separator = ";" if source == "Breuer2009" else ","
+        columns = list(pandas.read_csv(path, sep=separator, nrows=0).columns)
+        fields = [field for field, column in literature_fields.items() if column in columns]
+        usecols = ["y/h"] + [literature_fields[field] for field in fields]
+        csv_data = pandas.read_csv(path, usecols=usecols, sep=separator)
+        for field in fields:
+            parsed.append(((source, x_value, field),
+                           [numpy.array(csv_data[literature_fields[field]]), numpy.array(csv_data["y/h"])]))
+
+    return parsed
+
+
+# Parse all the literature files of path_to_literature and save them to its database
+def build_literature_database(path_to_literature):
+    files = literature_files(path_to_literature)
+    keys = []
+    profiles = []
+    for path in files:
+        for (source, x_value, field), profile in parse_literature_file(path):
+            keys.append((folder_reynolds(path.parents[1]), source, x_value, field))
+            profiles.append(numpy.asarray(profile, dtype=float).reshape(2, -1))
+
+    sources = [os.stat(path) for path in files]
+    lengths = [profile.shape[1] for profile in profiles]
+
+    # Write to a temporary file and rename it, so an interrupted build is never used
+    database_file = Path(path_to_literature) / database_name
+    temporary_file = database_file.with_name(database_file.stem + ".tmp.npz")
+    numpy.savez(temporary_file, version=database_version,
+                files=numpy.array([str(path.relative_to(path_to_literature)) for path in files]),
+                file_sizes=numpy.array([source.st_size for source in sources], dtype=numpy.int64),
+                file_mtimes_ns=numpy.array([source.st_mtime_ns for source in sources], dtype=numpy.int64),
+                reynolds=numpy.array([key[0] for key in keys], dtype=numpy.int64),
+                sources=numpy.array([key[1] for key in keys]),
+                x_values=numpy.array([numpy.nan if key[2] is None else key[2] for key in keys], dtype=float),
+                fields=numpy.array([key[3] for key in keys]),
+                offsets=numpy.append(0, numpy.cumsum(lengths)).astype(numpy.int64),
+                values=numpy.concatenate(profiles, axis=1) if profiles else numpy.empty((2, 0)))
+    os.replace(temporary_file, database_file)
+    print("Literature database " + str(database_file) + " built (" + str(len(files)) + " files, " + str(len(keys))
+          + " profiles)")
+
+
+# Load the database of path_to_literature
+# Returns a dictionary {(Re, source, x_value, field): [data, y]}, or None if the database does not exist or is not up
+# to date with the literature files
+def read_literature_database(path_to_literature):
+    database_file = Path(path_to_literature) / database_name
+    if not database_file.is_file():
+        return None
+
+    key = str(database_file.resolve())
+    mtime_ns = os.stat(database_file).st_mtime_ns
+    if key in loaded_databases and loaded_databases[key][0] == mtime_ns:
+        return loaded_databases[key][1]
+
+    with numpy.load(database_file) as stored:
+        stored = {name: stored[name] for name in stored.files}
+
+    files = literature_files(path_to_literature)
+    sources = [os.stat(path) for path in files]
+    if (stored["version"] != database_version
+            or [str(path.relative_to(path_to_literature)) for path in files] != [str(name) for name in stored["files"]]
+            or [source.st_size for source in sources] != list(stored["file_sizes"])
+            or [source.st_mtime_ns for source in sources] != list(stored["file_mtimes_ns"])):
+        return None
+
+    offsets = stored["offsets"]
+    database = {}
+    for i, (reynolds, source, x_value, field) in enumerate(zip(stored["reynolds"], stored["sources"],
+                                                              stored["x_values"], stored["fields"])):
+        x_value = None if numpy.isnan(x_value) else float(x_value)
+        database[(int(reynolds), str(source), x_value, str(field))] = stored["values"][:, offsets[i]:offsets[i + 1]]
+
+    loaded_databases[key] = (mtime_ns, database)
+    return database
+
+
+# Load the database of path_to_literature, building it first if it does not exist or is not up to date
+def literature_database(path_to_literature):
+    database = read_literature_database(path_to_literature)
+    if database is None:
+        build_literature_database(path_to_literature)
+        database = read_literature_database(path_to_literature)
+
+    return database
+
+
+# Profile [data, y] (array of shape (2, n), a copy that can be modified) of the literature data, None if there is no
+# data for this profile
+# x_value is None for the curves along the wall
+def literature_profile(path_to_literature, Re, source, x_value, field):
+    profile = literature_database(path_to_literature).get((Re, source, None if x_value is None else float(x_value),
+                                                           field))
+    return None if profile is None else profile.copy()
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    for path_to_literature in [argument for argument in sys.argv[1:] if not argument.startswith("--")] or ["./lit/"]:
+        if read_literature_database(path_to_literature) is None:
+            build_literature_database(path_to_literature)
+        else:
+            print("Literature database " + str(Path(path_to_literature) / database_name) + " is up to date")
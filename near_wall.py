@@ -0,0 +1,135 @@
+# Name   : near_wall.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Vectorized near-wall functions shared by near_wall_processing_new.py, mesh_quality.py and
+#          y_plus_on_geometry.py.
+#          The wall-nearest point of each x value is found with a single sort by (x, y) of the near-wall data, instead of
+#          searching every unique x value in the whole array.
+#          The wall-nearest points can also be found while the Lethe file is read (read_wall_nearest_points): each chunk
+#          is reduced to the sums and numbers of points at the minimum y of each x, merged with the reduction of the
+#          previous chunks, so the memory used depends on the number of x values and not on the size of the mesh.
+
+from pathlib import Path
+
+import numpy
+import pandas
+
+from coordinate_binning import coordinate_bins, coordinate_tolerance
+from lethe_cache import read_lethe_csv
+from lethe_zone_map import read_lethe_zones
+from spanwise_averaging import spanwise_average
+from spanwise_field import read_averaged_range, read_spanwise_field
+from stage_profiling import profile_stage, profiled_stage
+
+
+# Find the wall-nearest point of each unique x value and average its data in z
+# wall_array has one row per point and columns [x, y, u, other data types...]
+# For each x, the wall-nearest point is the minimum y among the points where u (velocity_column) is not zero, and all
+# the columns after y are averaged over the points at this x and y (i.e. in the z direction), the x and y values being
+# compared with coordinate_tolerance
+# Returns an array sorted by x with columns [x, y, z-averaged u, z-averaged other data types...]
+@profiled_stage("wall-nearest")
+def wall_nearest_point_average(wall_array, velocity_column=2):
+    wall_array = numpy.asarray(wall_array, dtype=float)
+
+    # Points on the wall have a velocity equal to zero
+    wall_array = wall_array[wall_array[:, velocity_column] != 0]
+    if wall_array.shape[0] == 0:
+        return numpy.empty((0, wall_array.shape[1]))
+
+    # Sort by x (bins of the x values), then by y, so the first point of each x is the wall-nearest point
+    x_keys, x_index = coordinate_bins(wall_array[:, 0])
+    order = numpy.lexsort((wall_array[:, 1], x_index))
+    wall_array, x_index = wall_array[order], x_index[order]
+    first_of_x = numpy.ones(wall_array.shape[0], dtype=bool)
+    first_of_x[1:] = x_index[1:] != x_index[:-1]
+
+    # Keep the points at the minimum y of their x and average them in z
+    nearest = wall_array[:, 1] - wall_array[first_of_x, 1][x_index] <= coordinate_tolerance
+    _, average_data, _ = spanwise_average(x_index[nearest], wall_array[nearest, 2:])
+
+    return numpy.column_stack((x_keys, wall_array[first_of_x, 1], average_data))
+
+
+# Reduce rows with columns x, y, sums of data and numbers of points to the rows at the minimum y of each x, where the
+# sums and the numbers of points are added
+# Returns x (sorted), the minimum y of each x, the sums and the numbers of points of each x, the x and y values being
+# compared with coordinate_tolerance
+def reduce_wall_nearest(x, y, sums, counts):
+    x_keys, x_index = coordinate_bins(x)
+    order = numpy.lexsort((y, x_index))
+    x_index, y, sums, counts = x_index[order], y[order], sums[order], counts[order]
+    first_of_x = numpy.ones(len(x_index), dtype=bool)
+    first_of_x[1:] = x_index[1:] != x_index[:-1]
+
+    # The points at the minimum y of each x are the first points of each x, so their sums are added by x
+    nearest = y - y[first_of_x][x_index] <= coordinate_tolerance
+    starts = numpy.flatnonzero(first_of_x[nearest])
+    return (x_keys, y[first_of_x], numpy.add.reduceat(sums[nearest], starts, axis=0),
+            numpy.add.reduceat(counts[nearest], starts))
+
+
+# Add the points of wall_array (columns [x, y, u, other data types...]) to the accumulator of the wall-nearest points
+# of each x (None for the first chunk), the points with u (velocity_column) equal to zero being on the wall
+# Returns the accumulator: x, the minimum y of each x, the sums of the data and the numbers of points at this y
+def accumulate_wall_nearest(accumulator, wall_array, velocity_column=2):
+    wall_array = numpy.asarray(wall_array, dtype=float)
+    wall_array = wall_array[wall_array[:, velocity_column] != 0]
+    if wall_array.shape[0] == 0:
+        return accumulator
+
+    chunk = reduce_wall_nearest(wall_array[:, 0], wall_array[:, 1], wall_array[:, 2:], numpy.ones(len(wall_array)))
+    if accumulator is None:
+        return chunk
+
+    return reduce_wall_nearest(*[numpy.concatenate((accumulated, values)) for accumulated, values in
+                                 zip(accumulator, chunk)])
+
+
+# Array of the wall-nearest points of the accumulator, as returned by wall_nearest_point_average
+def wall_nearest_accumulator_array(accumulator, n_columns):
+    if accumulator is None or len(accumulator[0]) == 0:
+        return numpy.empty((0, n_columns))
+
+    x, y, sums, counts = accumulator
+    return numpy.column_stack((x, y, sums / counts[:, None]))
+
+
+# Read the wall-nearest point of each x of lethe_csv among the points where lower_bound < column < upper_bound for any
+# of the bounds, with the data of usecols averaged in z (usecols starts with Points_0 and Points_1 and the velocity is
+# the third column of the file in usecols, as read_averaged_range would return them)
+# The spanwise-averaged field is used when it is up to date, otherwise each chunk of the file (parsed by jobs
+# processes) is reduced to its wall-nearest points as it is read, so the whole file is never in memory
+# Returns a dataframe with the columns of usecols, one row per x sorted by x (see wall_nearest_point_average)
+def read_wall_nearest_points(lethe_csv, usecols, column, bounds, chunksize=100000, jobs=1):
+    field = read_spanwise_field(lethe_csv)
+    if field is not None and all(name in ["Points_0", "Points_1"] + field["data_types"] for name in usecols):
+        lethe_data_range = read_averaged_range(lethe_csv, usecols, column, bounds, jobs=jobs)
+        return pandas.DataFrame(wall_nearest_point_average(lethe_data_range.to_numpy()),
+                                columns=lethe_data_range.columns)
+
+    with profile_stage("read", label=Path(lethe_csv).name) as stage:
+        lower_bounds = numpy.array([bound[0] for bound in bounds], dtype=float)
+        upper_bounds = numpy.array([bound[1] for bound in bounds], dtype=float)
+        read_columns = list(usecols) if column in usecols else list(usecols) + [column]
+
+        chunks = read_lethe_zones(lethe_csv, read_columns, column, bounds, jobs=jobs)
+        if chunks is None:
+            chunks = read_lethe_csv(lethe_csv, usecols=read_columns, chunksize=chunksize, jobs=jobs)
+
+        accumulator = None
+        columns = None
+        for chunk in chunks:
+            # As pandas.read_csv, the columns are in the order of the file
+            columns = [name for name in chunk.columns if name in usecols]
+            with profile_stage("wall-nearest", rows=len(chunk)):
+                values = chunk[column].to_numpy()[:, None]
+                in_range = numpy.any((values > lower_bounds) & (values < upper_bounds), axis=1)
+                accumulator = accumulate_wall_nearest(accumulator, chunk.loc[in_range, columns].to_numpy())
+
+        columns = columns or list(usecols)
+        wall_nearest_data = pandas.DataFrame(wall_nearest_accumulator_array(accumulator, len(columns)),
+                                             columns=columns)
+        stage["rows"] = len(wall_nearest_data)
+
+    return wall_nearest_data
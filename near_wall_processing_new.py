@@ -12,6 +12,12 @@ import numpy
 import itertools
 from matplotlib import pyplot as plt
 from pathlib import Path
+from functools import partial
+from spanwise_field import read_averaged_range
+from parallel_processing import jobs_argument, jobs_per_file, map_in_order
+from near_wall import read_wall_nearest_points, wall_nearest_point_average
+from hill_geometry import wall_height
+from stage_profiling import profiled_stage
 import time
 start_time = time.time()
 
@@ -64,27 +70,37 @@ Path(folder_to_save_csv).mkdir(parents=True, exist_ok=True)
 # Display the title on the output graphs? (True or False)
 display_title = False
 
+# Number of Lethe files extracted in parallel (or python near_wall_processing_new.py --jobs N)
+jobs = jobs_argument(default=1)
+
+# Reduce the chunks of each Lethe file to the wall-nearest point of each x while it is read, so the near-wall data
+# of the whole file is never in memory (False to read all the near-wall points before finding the wall-nearest ones)
+streaming = True
+
 ########################################################################################################################
 
 # Lethe data extraction of files associated with x/h
-def lethe_data_extraction(path_to_lethe_data, file_names_lethe_data, Re):
+def lethe_data_extraction(path_to_lethe_data, file_names_lethe_data, Re, jobs=1, streaming=False):
     assert Re == 5600 or Re == 10600 or Re == 37000, "Currently available for Re = 5600, 10600, 37000 only."
 
+    # Saves required columns in range [0, 1.1] to Pandas dataframe lethe_data_range (up to y=1.2 for hills)
+    # (from the spanwise-averaged field or the index of lethe_csv if they were built, otherwise iterating through the
+    # file), with jobs files in parallel (the processes left are used to parse each file)
+    # With streaming, only the wall-nearest point of each x (averaged in z) is kept from each chunk of the file
+    lethe_csvs = [path_to_lethe_data + file_name + ".csv" for file_name in file_names_lethe_data]
+    read_near_wall_data = read_wall_nearest_points if streaming else read_averaged_range
+    read_lower_wall = partial(read_near_wall_data, usecols=["Points_0", "Points_1", "average_velocity_0",
+                                                            "reynolds_shear_stress_uv"],
+                              column="Points_1", bounds=[(0, 9)], chunksize=100000 if streaming else 1000,
+                              jobs=jobs_per_file(jobs, len(lethe_csvs)))
+    lethe_lower_wall_datas = map_in_order(read_lower_wall, lethe_csvs, jobs)
+
     # Set index
     index = 1
     extracted_lethe_data = []
 
-    # For each Lethe file present
-    for file_name in file_names_lethe_data:
-        lethe_csv = path_to_lethe_data + file_name + ".csv"
-        # Iterates through lethe_csv file
-        iter_csv = pandas.read_csv(lethe_csv, usecols=["Points_0", "Points_1", "average_velocity_0",
-                                                       "reynolds_shear_stress_uv"], sep=",", iterator=True,
-                                                        chunksize=1000)
-        # Saves required columns in range [0, 1.1] to Pandas dataframe lethe_data_range (up to y=1.2 for hills)
-        lethe_lower_wall_data = pandas.concat(
-            [chunk[(chunk["Points_1"] > 0) & (chunk["Points_1"] < 9)] for chunk in iter_csv])
-
+    # For each Lethe file present, in the order of file_names_lethe_data
+    for lethe_lower_wall_data in lethe_lower_wall_datas:
         # Sort dataframe by x value
         lethe_lower_wall_data.sort_values(by=['Points_0'])
 
@@ -109,47 +125,10 @@ def reattachment(extracted_lethe_data, labels):
         wall_array = numpy.delete(data_array, 3, 1)
 
         # New array where x > 3.5 and x < 5.2
-        focussed_wall_array = []
-        for j in range(numpy.shape(wall_array)[0]):
-            if wall_array[j,0] > 3.5 and wall_array[j,0] < 5.2:
-                focussed_wall_array.append(wall_array[j,:])
-
-        focussed_wall_array = numpy.asarray(focussed_wall_array)
-
-        # For each value of x, average in z and find the wall-nearest point
-        # For each unique value of x "k"
-        wall_nearest_points = []
-        for k in numpy.unique(focussed_wall_array[:,0]):
-            # initialise y_nearest variable
-            y_nearest = None
-            averaging_data = []
-
-            # Each index "k" where the unique value of x appears
-            for m in numpy.where(focussed_wall_array == k)[0]:
-                # Find the minimum value of y at each value of x
-                # If y_nearest does not exist, initialise it
-                if y_nearest is None:
-                    y_nearest = numpy.array([focussed_wall_array[m, :]])
-                    averaging_data.append(y_nearest)
-                else:
-                    # if focussed_wall_array y value is smaller than y_nearest, replace and reintiialise averaging_data
-                    if focussed_wall_array[m,1] < y_nearest[0,1] and wall_array[m, 2] != 0:
-                        y_nearest = numpy.array([focussed_wall_array[m, :]])
-                        averaging_data = [y_nearest]
-                    elif focussed_wall_array[m,1] == y_nearest[0,1] and wall_array[m, 2] != 0:
-                        averaging_data.append(numpy.array([focussed_wall_array[m, :]]))
-
-            # Average data
-            averaging_data = numpy.asarray(averaging_data)
-            averaging_data = numpy.squeeze(averaging_data)
-            average = numpy.sum(averaging_data[:,2]) / numpy.shape(averaging_data)[0]
-            wall_point = [averaging_data[0,0], averaging_data[0,1], average]
-
-            # Append y_nearest to wall_nearest_points
-            wall_nearest_points.append(wall_point)
-
-        # Convert to array
-        wall_nearest_points = numpy.asarray(wall_nearest_points)
+        focussed_wall_array = wall_array[(wall_array[:, 0] > 3.5) & (wall_array[:, 0] < 5.2)]
+
+        # For each value of x, find the wall-nearest point and average in z
+        wall_nearest_points = wall_nearest_point_average(focussed_wall_array)
 
         # Find where u values change sign (first instance of u>0)
         upper_index = numpy.argmax(wall_nearest_points[:, 2] > 0, axis=0)
@@ -168,6 +147,7 @@ def reattachment(extracted_lethe_data, labels):
 
     return
 
+@profiled_stage("y-plus")
 def y_plus(extracted_lethe_data, viscosity, folder_to_save_csv):
 
     index = 1
@@ -176,106 +156,25 @@ def y_plus(extracted_lethe_data, viscosity, folder_to_save_csv):
     for i in range(len(extracted_lethe_data)):
         # Extract numpy array for each Lethe data file
         data_array = extracted_lethe_data[i]
-        wall_array = data_array[data_array[:, 0].argsort()]
-
-        # For each value of x, find the wall-nearest point
-        # For each unique value of x "k"
-        wall_nearest_points = []
-        for k in numpy.unique(wall_array[:,0]):
-            # initialise y_nearest variable
-            y_nearest = numpy.array([[1000000, 1000000, 1000000, 1000000]])
-            averaging_data = []
-
-            # Each index "k" where the unique value of x appears
-            for m in numpy.where(wall_array == k)[0]:
-                # Find the minimum value of y at each value of x
-                # if wall_array y value is smaller than y_nearest, replace
-                if wall_array[m,1] < y_nearest[0,1] and wall_array[m, 2] != 0.0:
-                    y_nearest = numpy.array([wall_array[m, :]])
-                    averaging_data = [y_nearest]
-                elif wall_array[m, 1] == y_nearest[0, 1] and wall_array[m, 2] != 0.0:
-                    averaging_data.append(numpy.array([wall_array[m, :]]))
-
-            # Average data
-            averaging_data = numpy.asarray(averaging_data)
-            averaging_data = numpy.squeeze(averaging_data)
-            average_u = numpy.sum(averaging_data[:, 2]) / numpy.shape(averaging_data)[0]
-            average_uv = numpy.sum(averaging_data[:, 3]) / numpy.shape(averaging_data)[0]
-            wall_point = [averaging_data[0, 0], averaging_data[0, 1], average_u, average_uv]
-
-            # Double check if there are double entries
-            for i in range(len(wall_nearest_points)):
-                if wall_nearest_points[i][0] == wall_point[0]:
-                    # Check y
-                    if wall_nearest_points[i][1] > wall_point[1]:
-                        print("Repeated entry for x = " + str(wall_point[0]))
-                        wall_nearest_points[i] = wall_point
-            
-            wall_nearest_points.append(wall_point)
-            
-
-        # Convert to array
-        wall_nearest_points = numpy.asarray(wall_nearest_points)
-        wall_nearest_points = wall_nearest_points[wall_nearest_points[:, 0].argsort()]
-
-        # Initialise output list
-        y_plus_data = []
+
+        # For each value of x, find the wall-nearest point and average in z (sorted by x)
+        wall_nearest_points = wall_nearest_point_average(data_array)
 
         # Calculate y+ at each x value
-        for m in range(numpy.shape(wall_nearest_points)[0]):
-            x = wall_nearest_points[m,0]
-            y1 = wall_nearest_points[m,1]
-
-            # Scale to h=28
-            x = 28*x
-
-            # Determine y value of wall (y0) from geometry
-            # First hill
-            if x < 9:
-                y0 = min(2.800000000000E+01, 2.800000000000E+01 + (0.000000000000E+00 * x) + (6.775070969851E-03 * (x ** 2)) - (2.124527775800E-03 * (x ** 3)))
-            elif 9 <= x < 14:
-                y0 = 2.507355893131E+01 + (9.754803562315E-01 * x) - (1.016116352781E-01 * (x ** 2)) + (1.889794677828E-03 * (x ** 3))
-            elif 14 <= x < 20:
-                y0 = 2.579601052357E+01 + (+8.206693007457E-01 * x) - (9.055370274339E-02 * (x ** 2)) + (1.626510569859E-03 * (x ** 3))
-            elif 20 <= x < 30:
-                y0 = 4.046435022819E+01 - (1.379581654948E+00 * x) + (1.945884504128E-02 * (x ** 2)) - (2.070318932190E-04 * (x ** 3))
-            elif 30 <= x < 40:
-                y0 = 1.792461334664E+01 + (8.743920332081E-01 * x) - (5.567361123058E-02 * (x ** 2)) + (6.277731764683E-04 * (x ** 3))
-            elif 40 <= x < 54:
-                y0 = max(0, (5.639011190988E+01 - (2.010520359035E+00 * x) + (1.644919857549E-02 * (x ** 2)) + (2.674976141766E-05 * (x ** 3))))
-
-            # Second hill
-            elif 198 <= x < 212:
-                y0 = max(0, (5.639011190988E+01 - (2.010520359035E+00 * (252-x)) + (1.644919857549E-02 * ((252-x) ** 2)) + (2.674976141766E-05 * ((252-x) ** 3))))
-            elif 212 <= x < 222:
-                y0 = 1.792461334664E+01 + (8.743920332081E-01 * (252-x)) - (5.567361123058E-02 * ((252-x) ** 2)) + (6.277731764683E-04 * ((252-x) ** 3))
-            elif 222 <= x < 232:
-                y0 = 4.046435022819E+01 - (1.379581654948E+00 * (252-x)) + (1.945884504128E-02 * ((252-x) ** 2)) - (2.070318932190E-04 * ((252-x) ** 3))
-            elif 232 <= x < 238:
-                y0 = 2.579601052357E+01 + (+8.206693007457E-01 * (252-x)) - (9.055370274339E-02 * ((252-x) ** 2)) + (1.626510569859E-03 * ((252-x) ** 3))
-            elif 238 <= x < 243:
-                y0 = 2.507355893131E+01 + (9.754803562315E-01 * (252-x)) - (1.016116352781E-01 * ((252-x) ** 2)) + (1.889794677828E-03 * ((252-x) ** 3))
-            elif x >= 243:
-                y0 = min(2.800000000000E+01, 2.800000000000E+01 + (0.000000000000E+00 * (252-x)) + (6.775070969851E-03 * ((252-x) ** 2)) - (2.124527775800E-03 * ((252-x) ** 3)))
-
-            else:
-                y0 = 0
-
-            # Rescale for h=1
-            y0 = y0/28
-            x = x/28
-
-            assert y0 < y1, "The point on the wall y0 must have a lower y-value than the point immediately above the wall y1"
-
-            y_cc = (y1 - y0)/2
-            viscous_stress = viscosity * ((wall_nearest_points[m, 2]) / (y1 - y0))
-            re_stress = wall_nearest_points[m, 3]
-            tau = viscous_stress
-            y_plus = (y_cc*numpy.sqrt(abs(tau)))/(viscosity)
-            
-            y_plus_data.append([x, y_plus])
-
-        y_plus_data = numpy.asarray(y_plus_data)
+        x = wall_nearest_points[:, 0]
+        y1 = wall_nearest_points[:, 1]
+
+        # Determine y value of wall (y0) from geometry
+        y0 = wall_height(x)
+
+        assert numpy.all(y0 < y1), "The point on the wall y0 must have a lower y-value than the point immediately above the wall y1"
+
+        y_cc = (y1 - y0)/2
+        viscous_stress = viscosity * ((wall_nearest_points[:, 2]) / (y1 - y0))
+        tau = viscous_stress
+        y_plus = (y_cc*numpy.sqrt(abs(tau)))/(viscosity)
+
+        y_plus_data = numpy.column_stack((x, y_plus))
 
         # Additional y+ data extraction
         y_plus_max = numpy.amax(y_plus_data[:, 1])
@@ -296,6 +195,7 @@ def y_plus(extracted_lethe_data, viscosity, folder_to_save_csv):
     return extracted_y_plus
 
 # Plot of y+ values
+@profiled_stage("plot")
 def plot_y_plus(folder_to_save_png, extracted_y_plus, labels, Re, title):
     # Plotting results
     plt.rcParams['text.usetex'] = True
@@ -351,7 +251,7 @@ assert len(labels) == len(file_names_lethe_data), f"It seems to have {len(file_n
                             f"{len(labels)} labels, please verify your labels names."
 
 # Collect required data types from near wall region
-lethe_data = lethe_data_extraction(path_to_lethe_data, file_names_lethe_data, Re)
+lethe_data = lethe_data_extraction(path_to_lethe_data, file_names_lethe_data, Re, jobs, streaming)
 # reattachment(lethe_data, labels)
 y_plus_data = y_plus(lethe_data, viscosity, folder_to_save_csv)
 plot_y_plus(folder_to_save_png, y_plus_data, labels, Re, display_title)
@@ -0,0 +1,151 @@
+# Name   : parallel_processing.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Parallel execution of the extraction of Lethe files with a pool of processes.
+#          The scripts give the number of processes with --jobs N on the command line (for example
+#          python lethe_data_extraction.py --jobs 3), each file is processed by a process of the pool and the results
+#          are returned in the order of the files, so the outputs are the same as with a single process.
+#          A single large .csv file can also be parsed in parallel: the file is split into byte ranges aligned on the
+#          lines, each range is parsed by a process of the pool (only the required columns, as float64) and the ranges
+#          are returned in the order of the rows. The processes left by the number of files are used for the ranges.
+#          Only futures_per_job items per process are submitted at once, the next ones being submitted as the results
+#          are consumed, so the results waiting to be consumed (for example the chunks of a file) stay bounded.
+#          The processes are started with fork, since the scripts run their functions at import and would run again in
+#          processes started with spawn. Where fork is not available (Windows), the files are processed one after the
+#          other.
+
+import io
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas
+
+# Number of byte ranges per process, so the processes finishing first take more ranges
+ranges_per_job = 4
+
+# Minimum size of a byte range (bytes), smaller files are split in fewer ranges
+minimum_range_size = 1 << 22
+
+# Number of items submitted to each process ahead of the result being consumed
+futures_per_job = 2
+
+
+# Number of processes given with --jobs N (or --jobs=N) on the command line, default if it is not given
+def jobs_argument(default=1):
+    arguments = sys.argv[1:]
+    for i, argument in enumerate(arguments):
+        if argument.startswith("--jobs="):
+            jobs = int(argument[len("--jobs="):])
+        elif argument == "--jobs" and i + 1 < len(arguments):
+            jobs = int(arguments[i + 1])
+        else:
+            continue
+        assert jobs >= 1, "The number of jobs must be at least 1."
+        return jobs
+
+    return default
+
+
+# Apply function to each item with a pool of jobs processes
+# function must be defined in a module (or be a functools.partial of such a function), and the items and results must
+# be picklable
+# Returns the list of results in the order of the items
+def map_in_order(function, items, jobs=1):
+    return list(iterate_in_order(function, items, jobs))
+
+
+# Apply function to each item with a pool of jobs processes, as map_in_order, and yield the results in the order of the
+# items as they are available
+# At most futures_per_job * jobs items are submitted ahead of the result being yielded
+def iterate_in_order(function, items, jobs=1):
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for item in items:
+            yield function(item)
+        return
+
+    jobs = min(jobs, len(items))
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+        try:
+            for item in items:
+                if len(pending) == futures_per_job * jobs:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(function, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The items not started are not run if the results are not consumed up to the end
+            for future in pending:
+                future.cancel()
+
+
+# Number of processes used to parse each file when jobs processes extract n_files files in parallel
+def jobs_per_file(jobs, n_files):
+    return max(1, jobs // max(1, n_files))
+
+
+# Split the rows of csv_file (after the header line) into byte ranges aligned on the lines
+# The ranges have about range_size bytes if it is given, otherwise there are about ranges_per_job ranges per process
+# Returns a list of (start, stop) byte positions
+def csv_byte_ranges(csv_file, jobs=1, range_size=None):
+    size = os.path.getsize(csv_file)
+    with open(csv_file, "rb") as file:
+        file.readline()
+        header_end = file.tell()
+        if range_size is None:
+            n_ranges = max(1, min(jobs * ranges_per_job, (size - header_end) // minimum_range_size))
+        else:
+            n_ranges = max(1, -(-(size - header_end) // range_size))
+
+        bounds = [header_end]
+        for i in range(1, n_ranges):
+            file.seek(header_end + i * (size - header_end) // n_ranges)
+            file.readline()
+            if file.tell() > bounds[-1]:
+                bounds.append(file.tell())
+        bounds.append(size)
+
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+# Parse the lines of csv_file in the byte range (start, stop) to a Pandas dataframe of usecols (as float64)
+# names are the names of all the columns of the file, given by its header line
+def read_csv_byte_range(byte_range, csv_file, names, usecols):
+    start, stop = byte_range
+    with open(csv_file, "rb") as file:
+        file.seek(start)
+        data = file.read(stop - start)
+
+    return pandas.read_csv(io.BytesIO(data), sep=",", header=None, names=names, usecols=usecols,
+                           dtype={name: "float64" for name in usecols})
+
+
+# Average size (bytes) of the first n_lines lines of csv_file after the header line
+def csv_line_size(csv_file, n_lines=1000):
+    with open(csv_file, "rb") as file:
+        file.readline()
+        lines = [line for line in (file.readline() for _ in range(n_lines)) if line]
+
+    return max(1, sum(len(line) for line in lines) // max(1, len(lines)))
+
+
+# Iterate through usecols of csv_file by chunks parsed in parallel by jobs processes, as
+# pandas.read_csv(..., iterator=True), the chunks being the byte ranges of csv_byte_ranges
+# With chunksize, the ranges have about chunksize rows (at least minimum_range_size bytes), otherwise there are about
+# ranges_per_job ranges per process
+# The columns of the chunks are in the order of the file and their index is the row number in the file
+def read_csv_parallel(csv_file, usecols, jobs, chunksize=None):
+    names = list(pandas.read_csv(csv_file, sep=",", nrows=0).columns)
+    read_range = partial(read_csv_byte_range, csv_file=csv_file, names=names, usecols=list(usecols))
+    range_size = None if chunksize is None else max(chunksize * csv_line_size(csv_file), minimum_range_size)
+
+    start = 0
+    for chunk in iterate_in_order(read_range, csv_byte_ranges(csv_file, jobs, range_size), jobs):
+        chunk.index = pandas.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
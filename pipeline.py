@@ -0,0 +1,254 @@
+# Name   : pipeline.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Runner of the whole post-processing chain as a graph of stages, like make.
+#          The stages are:
+#            raw .csv file -> cache (lethe_cache.py) -> spanwise-averaged field (spanwise_field.py), for each Lethe file
+#            literature files -> literature database (literature_database.py) -> literature profiles
+#            (literature_data_extraction.py)
+#            fields -> Lethe profiles (lethe_data_extraction.py) and near-wall data (near_wall_processing_new.py,
+#            mesh_quality.py, y_plus_on_geometry.py)
+#            profiles -> statistics (scripts/extract_information_data_with_geometry_baseline.py) and figures
+#            (scripts/plot_*.py, scripts/reattachement_*.py)
+#          Each stage runs a script in its own process. A stage is run only if one of its input files (its script, the
+#          local modules it imports, directly or through other local modules, the files it reads and the outputs of the
+#          stages it depends on) was modified since its last successful run, or if a stage it depends on was run.
+#          The input files of each run are recorded in .pipeline/<stage>.json, with the output of the script in
+#          .pipeline/<stage>.log. The stages that do not depend on each other are run in parallel. The variables of the
+#          scripts (files, Reynolds number...) are still set in the scripts.
+#
+#          To run all the stages:                python pipeline.py
+#          To run some stages (and their inputs): python pipeline.py profiles figure:plot_data_with_geometry_baseline
+#          A kind of stage (cache, field, literature_database, literature, profiles, near_wall, statistics or figure)
+#          selects all its stages. Add --jobs N to run N stages at once, and --dry-run to list the stages to run.
+
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from parallel_processing import jobs_argument
+
+########################################################################################################################
+# SET VARIABLES
+
+# Path to folder where Lethe simulation data is stored
+path_to_lethe_data = "./lethe_data/"
+
+# Path to folder of the literature data
+path_to_literature = "./lit/"
+
+# Folder of the records of the stages
+stamp_folder = "./.pipeline/"
+
+########################################################################################################################
+
+
+# Local modules imported by script, directly or through other local modules (found is the set of the modules already
+# found), searched in the folder of the script and in the root folder of the repository
+# Returns the sorted paths of the modules
+def local_imports(script, found=None):
+    found = set() if found is None else found
+    for node in ast.walk(ast.parse(Path(script).read_bytes(), filename=str(script))):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+
+        for name in names:
+            for folder in [Path(script).parent, Path(".")]:
+                module = folder / (name.split(".")[0] + ".py")
+                if module.is_file():
+                    if str(module) not in found:
+                        found.add(str(module))
+                        local_imports(module, found)
+                    break
+
+    return sorted(found)
+
+
+# Stage running script (in cwd) after the stages deps, reading the files matching the patterns inputs and writing the
+# files outputs (the stage is run again if one of them is missing)
+# The local modules imported by the script are inputs of the stage
+def stage(script, deps=(), inputs=(), outputs=(), arguments=(), cwd="."):
+    script_file = Path(cwd) / script
+    return {"command": [sys.executable, Path(script).name] + list(arguments), "cwd": cwd, "deps": list(deps),
+            "inputs": [str(script_file)] + local_imports(script_file) + list(inputs), "outputs": list(outputs)}
+
+
+# Stages of the post-processing chain, indexed by name (kind:name, or kind for the stages of a kind with one stage)
+def pipeline_stages(path_to_lethe_data, path_to_literature):
+    stages = {}
+    lethe_csvs = sorted(glob.glob(str(Path(path_to_lethe_data) / "*.csv")))
+    for lethe_csv in lethe_csvs:
+        name = Path(lethe_csv).stem
+        cache_files = str(Path(lethe_csv).parent / (name + "_cache"))
+        stages["cache:" + name] = stage("lethe_cache.py", inputs=[lethe_csv], outputs=[cache_files + "/manifest.json"],
+                                        arguments=[lethe_csv])
+        stages["field:" + name] = stage("spanwise_field.py", deps=["cache:" + name],
+                                        inputs=[lethe_csv, cache_files + "/*"],
+                                        outputs=[str(Path(lethe_csv).parent / (name + "_spanwise_field.npz"))],
+                                        arguments=[lethe_csv])
+    fields = ["field:" + Path(lethe_csv).stem for lethe_csv in lethe_csvs]
+    field_files = [str(Path(path_to_lethe_data) / "*_spanwise_field.npz")]
+
+    stages["literature_database"] = stage("literature_database.py",
+                                          inputs=[str(Path(path_to_literature) / "Re_*/*/*.csv"),
+                                                  str(Path(path_to_literature) / "Re_*/*/*.dat")],
+                                          outputs=[str(Path(path_to_literature) / "literature_database.npz")],
+                                          arguments=[path_to_literature])
+    stages["literature"] = stage("literature_data_extraction.py", deps=["literature_database"],
+                                 inputs=[str(Path(path_to_literature) / "literature_database.npz")])
+
+    stages["profiles"] = stage("lethe_data_extraction.py", deps=fields, inputs=field_files)
+    for script in ["near_wall_processing_new.py", "mesh_quality.py", "y_plus_on_geometry.py"]:
+        stages["near_wall:" + Path(script).stem] = stage(script, deps=fields, inputs=field_files)
+
+    # The statistics and figures read the profiles of the output_csv folders
+    profile_stores = ["./output_csv/*/profiles.npz", "./output_csv/*/*/profiles.npz"]
+    stages["statistics:extract_information_data_with_geometry_baseline"] = stage(
+        "extract_information_data_with_geometry_baseline.py", deps=["profiles", "literature"], inputs=profile_stores,
+        cwd="./scripts/")
+    for script in sorted(glob.glob("./scripts/plot_*.py") + glob.glob("./scripts/reattachement_*.py")):
+        stages["figure:" + Path(script).stem] = stage(Path(script).name, deps=["profiles", "literature"],
+                                                      inputs=profile_stores, cwd="./scripts/")
+
+    return stages
+
+
+# Stages to run for targets (names or kinds of stages, all the stages if there is no target) and the stages they depend
+# on, sorted so each stage comes after the stages it depends on
+def select_stages(stages, targets):
+    selected = [name for name in stages if not targets or name in targets or name.split(":")[0] in targets]
+    assert not targets or selected, "No stage matches " + str(targets) + "."
+
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        assert name not in visiting, "The stages depend on each other through " + name + "."
+        visiting.add(name)
+        for dep in stages[name]["deps"]:
+            visit(dep)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in selected:
+        visit(name)
+    return ordered
+
+
+# Input files of a stage with their size and modification time, and the command of the stage
+def stage_fingerprint(stage_data):
+    files = sorted(set(path for pattern in stage_data["inputs"] for path in glob.glob(pattern)))
+    return {"command": stage_data["command"][1:],
+            "inputs": {path: [os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in files}}
+
+
+# Record of the last successful run of a stage
+def stamp_file(name):
+    return Path(stamp_folder) / (name.replace(":", "_") + ".json")
+
+
+# Output of the last run of a stage
+def log_file(name):
+    return Path(stamp_folder) / (name.replace(":", "_") + ".log")
+
+
+# True if the stage was run successfully with the same input files and its outputs exist
+def stage_up_to_date(name, stage_data, fingerprint):
+    if not stamp_file(name).is_file() or not all(Path(path).is_file() for path in stage_data["outputs"]):
+        return False
+    with open(stamp_file(name)) as file:
+        return json.load(file) == fingerprint
+
+
+# Run the script of a stage, its output being saved in the log of the stage
+# Returns True if the script succeeded
+def run_stage(name, stage_data, fingerprint):
+    # Figures are saved without being displayed
+    environment = dict(os.environ, MPLBACKEND="Agg")
+    with open(log_file(name), "w") as log:
+        result = subprocess.run(stage_data["command"], cwd=stage_data["cwd"], stdout=log, stderr=subprocess.STDOUT,
+                                env=environment)
+    if result.returncode != 0:
+        return False
+
+    with open(stamp_file(name), "w") as file:
+        json.dump(fingerprint, file, indent=2)
+    return True
+
+
+# Run the stages of targets that are not up to date, with jobs stages at once
+# Returns the list of the stages that failed (or were not run because a stage they depend on failed)
+def run_pipeline(stages, targets=(), jobs=1, dry_run=False):
+    Path(stamp_folder).mkdir(parents=True, exist_ok=True)
+    ordered = select_stages(stages, targets)
+    done = set()
+    ran = set()
+    failed = []
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while len(done) + len(failed) + len(running) < len(ordered) or running:
+            # Start the stages whose dependencies are done
+            for name in ordered:
+                if name in done or name in running.values() or name in failed:
+                    continue
+                if any(dep in failed for dep in stages[name]["deps"]):
+                    print("Stage " + name + " not run, a stage it depends on failed")
+                    failed.append(name)
+                    continue
+                if not all(dep in done for dep in stages[name]["deps"]) or len(running) >= max(1, jobs):
+                    continue
+
+                fingerprint = stage_fingerprint(stages[name])
+                dep_ran = any(dep in ran for dep in stages[name]["deps"])
+                if not dep_ran and stage_up_to_date(name, stages[name], fingerprint):
+                    print("Stage " + name + " is up to date")
+                    done.add(name)
+                elif dry_run:
+                    print("Stage " + name + " would run")
+                    done.add(name)
+                    ran.add(name)
+                else:
+                    print("Running stage " + name)
+                    running[executor.submit(run_stage, name, stages[name], fingerprint)] = name
+
+            if not running:
+                continue
+
+            # Wait for a stage to finish
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.result():
+                    print("Stage " + name + " done")
+                    done.add(name)
+                    ran.add(name)
+                else:
+                    print("Stage " + name + " failed, see " + str(log_file(name)))
+                    failed.append(name)
+
+    return failed
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    jobs = jobs_argument(default=1)
+    arguments = sys.argv[1:]
+    targets = [argument for i, argument in enumerate(arguments)
+               if not argument.startswith("--") and (i == 0 or arguments[i - 1] != "--jobs")]
+    failed = run_pipeline(pipeline_stages(path_to_lethe_data, path_to_literature), targets, jobs,
+                          dry_run="--dry-run" in arguments)
+    sys.exit(1 if failed else 0)
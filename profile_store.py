@@ -0,0 +1,151 @@
+# Name   : profile_store.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Store of the extracted profiles (Lethe and literature data) of an output folder.
+#          Instead of one small .csv file per (run, data type, x/h), lethe_data_extraction.py and
+#          literature_data_extraction.py save all the profiles of an output folder (for example
+#          output_csv/literature/5600/) in a single file, profiles.npz, indexed by (source, run, data type, x/h). The
+#          source is "Lethe", "Rapp2009" or "Breuer2009" and the run is the name of the Lethe file ("" for the
+#          literature). The file is written to a temporary file and renamed, so it is never partially written.
+#          The store is loaded once per folder (and again only if it is modified), so the obtain_data functions of the
+#          plotting scripts read all the profiles of a figure with a single open. read_profile_csv replaces
+#          pandas.read_csv for the former .csv files: it returns the same dataframe from the store, and reads the .csv
+#          file if the profile is not in the store (outputs extracted before the store).
+#          The profiles read are kept in a least recently used cache indexed by (folder, source, run, data type, x/h)
+#          (the folder gives the Reynolds number of the literature data) of at most profile_cache_size profiles, and
+#          read again only if their store or .csv file is modified. A batch of figures then reads each file once.
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy
+import pandas
+
+from stage_profiling import profile_stage, profiled_stage
+
+# Name of the store in each output folder
+store_name = "profiles.npz"
+
+# Stores already loaded, indexed by store path: (modification time, profiles)
+loaded_stores = {}
+
+# Maximum number of profiles in the cache
+profile_cache_size = 4096
+
+# Profiles already read, indexed by (folder, former .csv name), the name giving (source, run, field, x_value):
+# ((file read, modification time), profile), from the least to the most recently used
+profile_cache = OrderedDict()
+
+
+# Name of the former .csv file of a profile
+def profile_csv_name(source, run, field, x_value):
+    if source == "Lethe":
+        return "_Lethe_data_" + str(run) + "_" + str(field) + "_x_" + str(x_value) + ".csv"
+    return "_" + str(source) + str(field) + "_x_" + str(x_value) + ".csv"
+
+
+# Load all the profiles of the store of folder
+# Returns a dictionary {(source, run, field, x_value): profile}, where profile is an array [data, y] of shape (2, n) or
+# None if there is no data for this profile, and a dictionary {former .csv name: (source, run, field, x_value)}
+def read_profiles(folder):
+    store_file = Path(folder) / store_name
+    if not store_file.is_file():
+        return {}, {}
+
+    key = str(store_file.resolve())
+    mtime_ns = os.stat(store_file).st_mtime_ns
+    if key in loaded_stores and loaded_stores[key][0] == mtime_ns:
+        return loaded_stores[key][1]
+
+    with profile_stage("read", label=store_file), numpy.load(store_file) as stored:
+        offsets = stored["offsets"]
+        values = stored["values"]
+        profiles = {}
+        names = {}
+        for i, (source, run, field, x_value, name) in enumerate(zip(stored["sources"], stored["runs"],
+                                                                   stored["fields"], stored["x_values"],
+                                                                   stored["names"])):
+            profile_key = (str(source), str(run), str(field), float(x_value))
+            profiles[profile_key] = None if stored["empty"][i] else values[:, offsets[i]:offsets[i + 1]]
+            names[str(name)] = profile_key
+
+    loaded_stores[key] = (mtime_ns, (profiles, names))
+    return profiles, names
+
+
+# Add profiles to the store of folder, replacing the profiles with the same keys
+# profiles is a dictionary {(source, run, field, x_value): [data, y] or None}
+@profiled_stage("write")
+def write_profiles(folder, profiles):
+    stored_profiles, stored_names = read_profiles(folder)
+    names = {profile_key: name for name, profile_key in stored_names.items()}
+    all_profiles = dict(stored_profiles)
+    for (source, run, field, x_value), profile in profiles.items():
+        profile_key = (str(source), str(run), str(field), float(x_value))
+        all_profiles[profile_key] = None if profile is None else numpy.asarray(profile, dtype=float).reshape(2, -1)
+        names[profile_key] = profile_csv_name(source, run, field, x_value)
+
+    keys = list(all_profiles)
+    lengths = [0 if all_profiles[key] is None else all_profiles[key].shape[1] for key in keys]
+    values = [all_profiles[key] for key in keys if all_profiles[key] is not None]
+
+    # Write to a temporary file and rename it, so an interrupted write never corrupts the store
+    store_file = Path(folder) / store_name
+    temporary_file = store_file.with_name(store_file.stem + ".tmp.npz")
+    numpy.savez(temporary_file, sources=numpy.array([key[0] for key in keys]),
+                runs=numpy.array([key[1] for key in keys]), fields=numpy.array([key[2] for key in keys]),
+                x_values=numpy.array([key[3] for key in keys], dtype=float),
+                names=numpy.array([names[key] for key in keys]),
+                empty=numpy.array([all_profiles[key] is None for key in keys], dtype=bool),
+                offsets=numpy.append(0, numpy.cumsum(lengths)).astype(numpy.int64),
+                values=numpy.concatenate(values, axis=1) if values else numpy.empty((2, 0)))
+    os.replace(temporary_file, store_file)
+
+
+# Profile [data, y] (array of shape (2, n)) named profile_csv_name in folder, None if there is no data for this profile
+# The profile is read from the store of folder, or from its former .csv file if it is not in the store, and kept in the
+# profile cache (the array must not be modified)
+def cached_profile(folder, name):
+    profiles, names = read_profiles(folder)
+    profile_file = Path(folder) / (store_name if name in names else name)
+    version = (str(profile_file.resolve()), os.stat(profile_file).st_mtime_ns)
+
+    key = (str(Path(folder).resolve()), name)
+    if key in profile_cache and profile_cache[key][0] == version:
+        profile_cache.move_to_end(key)
+        return profile_cache[key][1]
+
+    if name in names:
+        profile = profiles[names[name]]
+    else:
+        # Former .csv file: the index column, then one column per point
+        profile = pandas.read_csv(profile_file).to_numpy()[:, 1:].astype(float)
+        profile = profile if profile.size else None
+
+    profile_cache[key] = (version, profile)
+    while len(profile_cache) > profile_cache_size:
+        profile_cache.popitem(last=False)
+
+    return profile
+
+
+# Profile [data, y] (array of shape (2, n), a copy that can be modified) of folder, None if there is no data for this
+# profile
+def read_profile(folder, source, run, field, x_value):
+    profile = cached_profile(folder, profile_csv_name(source, run, field, x_value))
+    return None if profile is None else profile.copy()
+
+
+# Read a profile from its former .csv file path, as pandas.read_csv(profile_csv)
+# The profile is read from the store of the folder of the .csv file, or from the .csv file if it is not in the store
+def read_profile_csv(profile_csv):
+    profile_csv = Path(profile_csv)
+    profile = cached_profile(profile_csv.parent, profile_csv.name)
+    if profile is None:
+        return pandas.DataFrame(columns=["Unnamed: 0"])
+
+    # Same layout as the .csv files: the index column, then one column per point
+    profile_data = pandas.DataFrame(profile.copy(), columns=[str(i) for i in range(profile.shape[1])])
+    profile_data.insert(0, "Unnamed: 0", [0, 1])
+    return profile_data
@@ -16,6 +16,10 @@ from matplotlib.patches import ConnectionPatch
 from pathlib import Path
 from scipy import interpolate
 from scipy.interpolate import interp1d
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from profile_store import read_profile_csv
+from stage_profiling import profiled_stage
 import time
 start_time = time.time()
 
@@ -67,19 +71,19 @@ def obtain_data(x_available, path_to_lethe_data, file_names_lethe_data, data_typ
 
         # Read data and append to list
         Rapp2009_csv = path_to_literature_data + '_Rapp2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Rapp2009_data = pandas.read_csv(Rapp2009_csv)
+        Rapp2009_data = read_profile_csv(Rapp2009_csv)
         Rapp2009_data = Rapp2009_data.to_numpy()
         data.append(Rapp2009_data)
 
         if Re == 5600 or Re == 10600:
             Breuer2009_csv = path_to_literature_data + '_Breuer2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-            Breuer2009_data = pandas.read_csv(Breuer2009_csv)
+            Breuer2009_data = read_profile_csv(Breuer2009_csv)
             Breuer2009_data = Breuer2009_data.to_numpy()
             data.append(Breuer2009_data)
 
         for file in file_names_lethe_data:
             Lethe_data_csv = path_to_lethe_data + '_Lethe_data_' + str(file) + '_' + str(data_type) + '_x_' + str(x_value) + '.csv'
-            Lethe_data = pandas.read_csv(Lethe_data_csv)
+            Lethe_data = read_profile_csv(Lethe_data_csv)
             Lethe_data = Lethe_data.to_numpy()
             data.append(Lethe_data)
 
@@ -88,6 +92,7 @@ def obtain_data(x_available, path_to_lethe_data, file_names_lethe_data, data_typ
     return all_x_data
 
 # Function to plot data at all x
+@profiled_stage("statistics")
 def calculate_statistics(x_available, Re, all_x_data, folder_to_save, scale_factor,
                        lethe_labels, x_label, data_type):
     
@@ -14,6 +14,10 @@ import matplotlib.ticker as ticker
 import matplotlib.patches as patches
 from matplotlib.patches import ConnectionPatch
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from profile_store import read_profile_csv
+from stage_profiling import profiled_stage
 import time
 # import tikzplotlib
 
@@ -66,19 +70,19 @@ def obtain_data(x_value, path_to_literature_data, path_to_lethe_data, file_names
 
     # Read data and append to list
     Rapp2009_csv = path_to_literature_data + '_Rapp2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-    Rapp2009_data = pandas.read_csv(Rapp2009_csv)
+    Rapp2009_data = read_profile_csv(Rapp2009_csv)
     Rapp2009_data = Rapp2009_data.to_numpy()
     Rapp2009_data = numpy.delete(Rapp2009_data, 0, 1)
     
     Breuer2009_csv = path_to_literature_data + '_Breuer2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-    Breuer2009_data = pandas.read_csv(Breuer2009_csv)
+    Breuer2009_data = read_profile_csv(Breuer2009_csv)
     Breuer2009_data = Breuer2009_data.to_numpy()
     Breuer2009_data = numpy.delete(Breuer2009_data, 0, 1)   
 
     Lethe_data=list()
     for file in file_names_lethe_data:
         Lethe_data_csv = path_to_lethe_data + '_Lethe_data_' + str(file) + '_' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Lethe_data_loc = pandas.read_csv(Lethe_data_csv)
+        Lethe_data_loc = read_profile_csv(Lethe_data_csv)
         Lethe_data_loc = Lethe_data_loc.to_numpy()
         Lethe_data_loc = numpy.delete(Lethe_data_loc, 0, 1)
         Lethe_data.extend(Lethe_data_loc)
@@ -86,6 +90,7 @@ def obtain_data(x_value, path_to_literature_data, path_to_lethe_data, file_names
     return Breuer2009_data, Rapp2009_data, Lethe_data
 
 # Plot literature values against Lethe values
+@profiled_stage("plot")
 def plot_to_png(Breuer2009_data, Rapp2009_data, lethe_data, data_type, x_value, labels,
                 folder_to_save_png, show_title):
     # Plotting results
@@ -12,6 +12,10 @@ import matplotlib.ticker as ticker
 import matplotlib.patches as patches
 from matplotlib.patches import ConnectionPatch
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from profile_store import read_profile_csv
+from stage_profiling import profiled_stage
 import time
 from mpl_toolkits.axes_grid.inset_locator import inset_axes
 
@@ -79,13 +83,13 @@ def obtain_data(x_values, path_to_literature_data, path_to_lethe_data, file_name
     for x_value in x_values:
         # Read data and append to list
         Rapp2009_csv = path_to_literature_data + '_Rapp2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Rapp2009_data = pandas.read_csv(Rapp2009_csv)
+        Rapp2009_data = read_profile_csv(Rapp2009_csv)
         Rapp2009_data = Rapp2009_data.to_numpy()
         Rapp2009_data = numpy.delete(Rapp2009_data, 0, 1)
         Rapp2009_all_data.append(Rapp2009_data)
     
         Breuer2009_csv = path_to_literature_data + '_Breuer2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Breuer2009_data = pandas.read_csv(Breuer2009_csv)
+        Breuer2009_data = read_profile_csv(Breuer2009_csv)
         Breuer2009_data = Breuer2009_data.to_numpy()
         Breuer2009_data = numpy.delete(Breuer2009_data, 0, 1)   
         Breuer2009_all_data.append(Breuer2009_data)
@@ -94,7 +98,7 @@ def obtain_data(x_values, path_to_literature_data, path_to_lethe_data, file_name
             Lethe_data=list()
             for file in file_names[i]:
                 Lethe_data_csv = path_to_lethe_data + '_Lethe_data_' + str(file) + '_' + str(data_type) + '_x_' + str(x_value) + '.csv'
-                Lethe_data_loc = pandas.read_csv(Lethe_data_csv)
+                Lethe_data_loc = read_profile_csv(Lethe_data_csv)
                 Lethe_data_loc = Lethe_data_loc.to_numpy()
                 Lethe_data_loc = numpy.delete(Lethe_data_loc, 0, 1)
                 Lethe_data.extend(Lethe_data_loc)
@@ -104,6 +108,7 @@ def obtain_data(x_values, path_to_literature_data, path_to_lethe_data, file_name
     return Breuer2009_all_data, Rapp2009_all_data, Lethe_all_data, Lethe_all_data_2, Lethe_all_data_3
 
 # Plot literature values against Lethe values
+@profiled_stage("plot")
 def plot_to_png(Breuer2009_all_data, Rapp2009_all_data, lethe_all_data, lethe_all_data_2, lethe_all_data_3, data_type, x_values, labels,
                 folder_to_save_png, time_step):
     # Plotting results
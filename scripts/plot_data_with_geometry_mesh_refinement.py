@@ -15,6 +15,11 @@ import matplotlib.ticker as ticker
 import matplotlib.patches as patches
 from matplotlib.patches import ConnectionPatch
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from profile_store import read_profile_csv
+from stage_profiling import profiled_stage
+from hill_geometry import hill_geometry
 import time
 start_time = time.time()
 
@@ -61,114 +66,6 @@ display_title = False
 zoom_in_plots = True
 
 #######################################################################################################################
-# Function to define hill geometry
-def hill_geometry():
-    # Shape of lower wall geometry
-    # Polynomial coefficients
-    a1 = 2.800000000000E+01
-    b1 = 0.000000000000E+00
-    c1 = 6.775070969851E-03
-    d1 = -2.124527775800E-03
-
-    a2 = 2.507355893131E+01
-    b2 = 9.754803562315E-01
-    c2 = -1.016116352781E-01
-    d2 = 1.889794677828E-03
-
-    a3 = 2.579601052357E+01
-    b3 = 8.206693007457E-01
-    c3 = -9.055370274339E-02
-    d3 = 1.626510569859E-03
-
-    a4 = 4.046435022819E+01
-    b4 = -1.379581654948E+00
-    c4 = 1.945884504128E-02
-    d4 = -2.070318932190E-04
-
-    a5 = 1.792461334664E+01
-    b5 = 8.743920332081E-01
-    c5 = -5.567361123058E-02
-    d5 = 6.277731764683E-04
-
-    a6 = 5.639011190988E+01
-    b6 = -2.010520359035E+00
-    c6 = 1.644919857549E-02
-    d6 = 2.674976141766E-05
-
-    # Values related to the geometry
-    H = 28.0
-    max_x = 9 * H
-    max_y = 3.035 * H
-
-    # Initiate vectors for plotting
-    x_vector = numpy.linspace(0, max_x, 100)
-    y = numpy.empty(len(x_vector))
-
-    # Generate top and bottom lines for the geometry with polynomials
-    for i, x in enumerate(x_vector):
-        new_x = (max_x - x)  # for the right hill
-
-        # Polynomial equations for left hill
-        if 0 <= x < 9:
-            y[i] = a1 + b1 * x + c1 * x ** 2 + d1 * x ** 3
-            # Check and fix if y is over H
-            if y[i] > H:
-                y[i] = H
-
-        elif 9 <= x < 14:
-            y[i] = a2 + b2 * x + c2 * x ** 2 + d2 * x ** 3
-
-        elif 14 <= x < 20:
-            y[i] = a3 + b3 * x + c3 * x ** 2 + d3 * x ** 3
-
-        elif 20 <= x < 30:
-            y[i] = a4 + b4 * x + c4 * x ** 2 + d4 * x ** 3
-
-        elif 30 <= x < 40:
-            y[i] = a5 + b5 * x + c5 * x ** 2 + d5 * x ** 3
-
-        elif 40 <= x < 54:
-            y[i] = a6 + b6 * x + c6 * x ** 2 + d6 * x ** 3
-            # Check and fix if y is under 0
-            if y[i] < 0:
-                y[i] = 0.0
-
-        # Polynomial equations for left hill
-        elif 243 < x <= 252:
-            y[i] = a1 + b1 * new_x + c1 * new_x ** 2 + d1 * new_x ** 3
-            # Check and fix if y is over H
-            if y[i] > H:
-                y[i] = H
-
-        elif 238 < x <= 243:
-            y[i] = a2 + b2 * new_x + c2 * new_x ** 2 + d2 * new_x ** 3
-
-        elif 232 < x <= 238:
-            y[i] = a3 + b3 * new_x + c3 * new_x ** 2 + d3 * new_x ** 3
-
-        elif 222 < x <= 232:
-            y[i] = a4 + b4 * new_x + c4 * new_x ** 2 + d4 * new_x ** 3
-
-        elif 212 < x <= 222:
-            y[i] = a5 + b5 * new_x + c5 * new_x ** 2 + d5 * new_x ** 3
-
-        elif 198 < x <= 212:
-            y[i] = a6 + b6 * new_x + c6 * new_x ** 2 + d6 * new_x ** 3
-            # Check and fix if y is under 0
-            if y[i] < 0:
-                y[i] = 0.0
-
-        # Set y to 0 if in flat area
-        else:
-            y[i] = 0.0
-
-    # Normalize results with H (like if H was 1 and not 28)
-    x_vector /= H
-    y_bottom = y / H
-    y_top = max_y * numpy.ones(len(x_vector)) / H
-
-    return x_vector, y_bottom, y_top
-
 # Function to retrieve data from .csv files
 def obtain_data(x_available, path_to_lethe_data, file_names_lethe_data, data_type, path_to_literature_data):
     all_x_data = []
@@ -177,19 +74,19 @@ def obtain_data(x_available, path_to_lethe_data, file_names_lethe_data, data_typ
 
         # Read data and append to list
         Rapp2009_csv = path_to_literature_data + '_Rapp2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Rapp2009_data = pandas.read_csv(Rapp2009_csv)
+        Rapp2009_data = read_profile_csv(Rapp2009_csv)
         Rapp2009_data = Rapp2009_data.to_numpy()
         data.append(Rapp2009_data)
 
         Breuer2009_csv = path_to_literature_data + '_Breuer2009' + str(data_type) + '_x_' + str(x_value) + '.csv'
-        Breuer2009_data = pandas.read_csv(Breuer2009_csv)
+        Breuer2009_data = read_profile_csv(Breuer2009_csv)
         Breuer2009_data = Breuer2009_data.to_numpy()
         data.append(Breuer2009_data)
 
         i = 0
         for file in file_names_lethe_data:
             Lethe_data_csv = path_to_lethe_data + '_Lethe_data_' + str(file) + '_' + str(data_type) + '_x_' + str(x_value) + '.csv'
-            Lethe_data = pandas.read_csv(Lethe_data_csv)
+            Lethe_data = read_profile_csv(Lethe_data_csv)
             Lethe_data = Lethe_data.to_numpy()
             data.append(Lethe_data)
             i = i + 1
@@ -200,6 +97,7 @@ def obtain_data(x_available, path_to_lethe_data, file_names_lethe_data, data_typ
     return all_x_data
 
 # Function to plot data at all x
+@profiled_stage("plot")
 def plot_onto_geometry(x_available, Re, all_x_data, folder_to_save, x_vector, y_bottom, y_top, scale_factor,
                        lethe_labels, x_label, show_title, data_type):
     
@@ -0,0 +1,145 @@
+# Name   : spanwise_averaging.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Vectorized reductions used to average Lethe data in the spanwise (z) direction.
+#          The points sharing the same key (for example the same y value on a x plane) are grouped with a single sort
+#          and the data of every column is summed with numpy.bincount, instead of searching the points of each key.
+#          Coordinates (float keys) are grouped by bins of coordinate_tolerance (see coordinate_binning.py), so the
+#          points of a grid line whose coordinates differ by a round-off error are averaged together.
+#          Data larger than the memory is averaged by chunks (spanwise_average_chunks): each chunk is reduced to the
+#          number of points, the sums and the sums of the squared deviations of each key, which are merged into an
+#          accumulator with one row per key, so only the accumulator of the unique keys is kept in memory.
+
+import numpy
+
+from coordinate_binning import coordinate_groups
+from stage_profiling import profiled_stage
+
+
+# Group the keys, the float keys (coordinates) being grouped by bins of coordinate_tolerance
+# Returns the sorted unique keys, the index of the key of each point and the number of points per key
+def _group_keys(keys):
+    keys = numpy.asarray(keys)
+
+    if numpy.issubdtype(keys.dtype, numpy.floating):
+        return coordinate_groups(keys)
+    if keys.ndim == 2:
+        unique_keys, inverse, counts = numpy.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    else:
+        unique_keys, inverse, counts = numpy.unique(keys.ravel(), return_inverse=True, return_counts=True)
+
+    return unique_keys, inverse.ravel(), counts
+
+
+# Group the keys and sum every column of data over the points that share the same key
+# Returns the sorted unique keys, the index of the key of each point, the sums of each column and the number of points
+def _spanwise_sums(keys, data):
+    unique_keys, inverse, counts = _group_keys(keys)
+    return unique_keys, inverse, _bincount_columns(inverse, data, len(unique_keys)), counts
+
+
+# Sum every column of data for each of the n_keys indices of inverse
+def _bincount_columns(inverse, data, n_keys):
+    sums = numpy.empty((n_keys, data.shape[1]))
+    for k in range(data.shape[1]):
+        sums[:, k] = numpy.bincount(inverse, weights=data[:, k], minlength=n_keys)
+    return sums
+
+
+# Convert data to a float array with one column per data type
+def _data_columns(data):
+    data = numpy.asarray(data, dtype=float)
+    if data.ndim == 1:
+        data = data[:, None]
+    return data
+
+
+# Average every column of data over the points that share the same key
+# keys is an array of n values, or of n rows of values grouped together (for example (x, y) pairs), and data an array of
+# n values or of n rows with one column per data type
+# Returns the sorted unique keys, the average of each column of data for each key and the number of points per key
+@profiled_stage("z-average", rows=lambda result: int(result[2].sum()))
+def spanwise_average(keys, data):
+    unique_keys, _, sums, counts = _spanwise_sums(keys, _data_columns(data))
+    return unique_keys, sums / counts[:, None], counts
+
+
+# Average every column of data over the points that share the same key, as spanwise_average, and compute its variance
+# The variance (population variance, over the points of each key) is computed from the deviations to the average, which
+# is more accurate than from the sum of squares
+# Returns the sorted unique keys, the average and the variance of each column of data for each key and the number of
+# points per key
+@profiled_stage("z-average", rows=lambda result: int(result[3].sum()))
+def spanwise_average_and_variance(keys, data):
+    data = _data_columns(data)
+    unique_keys, inverse, sums, counts = _spanwise_sums(keys, data)
+    average = sums / counts[:, None]
+    variance = _bincount_columns(inverse, (data - average[inverse]) ** 2, len(unique_keys)) / counts[:, None]
+    return unique_keys, average, variance, counts
+
+
+# Merge a list of accumulators of spanwise sums (see _chunk_spanwise_sums)
+# The keys of the accumulators in the same bin are merged: the sum of the squared deviations of a merged key is the sum
+# of the squared deviations of its parts plus, for each part, its number of points times the squared deviation of its
+# average to the merged average (as in the parallel variance of Chan et al.)
+def _merge_spanwise_accumulators(accumulators):
+    unique_keys, inverse, _ = _group_keys(numpy.concatenate([part["keys"] for part in accumulators]))
+    part_counts = numpy.concatenate([part["counts"] for part in accumulators])
+    part_sums = numpy.concatenate([part["sums"] for part in accumulators])
+    part_deviations = numpy.concatenate([part["deviations"] for part in accumulators])
+
+    counts = numpy.bincount(inverse, weights=part_counts, minlength=len(unique_keys)).astype(part_counts.dtype)
+    sums = _bincount_columns(inverse, part_sums, len(unique_keys))
+    part_difference = part_sums / part_counts[:, None] - (sums / counts[:, None])[inverse]
+    deviations = _bincount_columns(inverse, part_deviations + part_counts[:, None] * part_difference ** 2,
+                                   len(unique_keys))
+
+    return {"keys": unique_keys, "counts": counts, "sums": sums, "deviations": deviations}
+
+
+# Accumulator of the spanwise sums of the points of a chunk (keys and data as in spanwise_average), None if the chunk is
+# empty
+# The accumulator is a dictionary with the sorted unique keys and, for each key, the number of points, the sums of each
+# column and the sums of the squared deviations of each column to its average
+@profiled_stage("z-average")
+def _chunk_spanwise_sums(keys, data):
+    data = _data_columns(data)
+    if data.shape[0] == 0:
+        return None
+
+    unique_keys, inverse, sums, counts = _spanwise_sums(keys, data)
+    deviations = _bincount_columns(inverse, (data - (sums / counts[:, None])[inverse]) ** 2, len(unique_keys))
+    return {"keys": unique_keys, "counts": counts, "sums": sums, "deviations": deviations}
+
+
+# Average every column of data_columns of chunks (dataframes, for example read by pandas.read_csv with a chunksize) over
+# the points that share the same values of key_columns, one chunk at a time
+# The accumulators of the chunks are buffered and merged with the accumulator of the previous chunks only once they have
+# as many keys as it, so each merge groups at most twice the keys of the buffered chunks and the cost of the merges
+# grows linearly with the number of chunks instead of regrouping all the keys seen so far for every chunk
+# Returns the sorted unique keys, the average and the variance of each column for each key and the number of points per
+# key, as spanwise_average_and_variance
+def spanwise_average_chunks(chunks, key_columns, data_columns):
+    accumulator = None
+    buffered = []
+    buffered_keys = 0
+    for chunk in chunks:
+        chunk_accumulator = _chunk_spanwise_sums(chunk[list(key_columns)].to_numpy(),
+                                                 chunk[list(data_columns)].to_numpy())
+        if chunk_accumulator is None:
+            continue
+        buffered.append(chunk_accumulator)
+        buffered_keys += len(chunk_accumulator["keys"])
+
+        if accumulator is None or buffered_keys >= len(accumulator["keys"]):
+            accumulator = _merge_spanwise_accumulators(buffered if accumulator is None else [accumulator] + buffered)
+            buffered = []
+            buffered_keys = 0
+
+    assert accumulator is not None, "The chunks must contain at least one point."
+    if buffered:
+        accumulator = _merge_spanwise_accumulators([accumulator] + buffered)
+
+    counts = accumulator["counts"]
+    return (accumulator["keys"], accumulator["sums"] / counts[:, None], accumulator["deviations"] / counts[:, None],
+            counts)
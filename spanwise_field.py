@@ -0,0 +1,185 @@
+# Name   : spanwise_field.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Spanwise-averaged 2D field store of the Lethe data.
+#          Each Lethe .csv file is collapsed once into a 2D (x, y) field with, for every data column, the average and
+#          the variance in the spanwise (z) direction and the number of points averaged. The field is saved next to the
+#          .csv file (lethe_data/<file_name>_spanwise_field.npz) with the size and modification time of the .csv file,
+#          so it is only used while it is up to date. This reduces the data by the number of points in z, and the
+#          profiles and near-wall extractions read the field instead of the whole file when it is available.
+#          The files larger than streaming_file_size (or all the files with --streaming) are averaged by chunks, so only
+#          the sums of the (x, y) points are in memory (see spanwise_average_chunks in spanwise_averaging.py).
+#
+#          To build the fields: python spanwise_field.py ./lethe_data/file_name_1.csv ./lethe_data/file_name_2.csv
+
+import os
+import sys
+from pathlib import Path
+
+import numpy
+import pandas
+
+from coordinate_binning import coordinate_bins
+from lethe_cache import read_lethe_csv, read_lethe_dataframe, read_manifest, open_lethe_columns
+from lethe_index import read_lethe_range
+from spanwise_averaging import spanwise_average_and_variance, spanwise_average_chunks
+from stage_profiling import profile_stage
+from structured_grid import grid_spanwise_average, structured_grid
+
+# Version of the field layout, fields written with another version are considered stale
+# Version 2: the points are grouped by bins of coordinate_tolerance instead of exact equality of their coordinates
+field_version = 2
+
+# Coordinates of the Lethe data, which are not averaged
+coordinate_columns = ["Points_0", "Points_1", "Points_2"]
+
+# Fields already loaded, indexed by (field file, modification time)
+loaded_fields = {}
+
+# Size (bytes) of the Lethe .csv files above which the field is built by chunks instead of reading the whole file
+streaming_file_size = 2 * 1024 ** 3
+
+# Number of rows of the chunks of the Lethe .csv files averaged by chunks
+streaming_chunksize = 1000000
+
+
+# Path of the spanwise-averaged field associated with a Lethe .csv file
+def spanwise_field_file(lethe_csv):
+    lethe_csv = Path(lethe_csv)
+    return lethe_csv.parent / (lethe_csv.stem + "_spanwise_field.npz")
+
+
+# Data columns (all columns except the coordinates) of a Lethe .csv file
+def lethe_data_types(lethe_csv):
+    lethe_columns = open_lethe_columns(lethe_csv) if read_manifest(lethe_csv) is not None else None
+    if lethe_columns is not None:
+        columns = list(lethe_columns)
+    else:
+        columns = list(pandas.read_csv(lethe_csv, sep=",", nrows=1).select_dtypes("number").columns)
+
+    return [name for name in columns if name not in coordinate_columns]
+
+
+# Complete a spanwise-averaged field with its unique x values (x_keys, by bins of coordinate_tolerance) and the offset
+# of the first row of each
+def index_spanwise_field(field):
+    x_keys, x_index = coordinate_bins(field["x"])
+    field["x_keys"] = x_keys
+    field["x_offsets"] = numpy.append(numpy.searchsorted(x_index, numpy.arange(len(x_keys))), len(field["x"]))
+    return field
+
+
+# Average data_types of lethe_csv in z for each unique (x, y)
+# When the points are a structured grid (see structured_grid.py), the average is a mean over the z axis of the grid
+# Returns a dictionary with the x and y values sorted by x then y, the average and the variance in z of each data type
+# (one column per data type) and the number of points averaged
+def compute_spanwise_field(lethe_csv, data_types):
+    lethe_data = read_lethe_dataframe(lethe_csv, usecols=["Points_0", "Points_1", "Points_2"] + list(data_types))
+
+    grid = structured_grid(lethe_data["Points_0"].to_numpy(), lethe_data["Points_1"].to_numpy(),
+                           lethe_data["Points_2"].to_numpy(), {name: lethe_data[name].to_numpy() for name in data_types})
+    if grid is not None:
+        averages = [grid_spanwise_average(grid, data_type) for data_type in data_types]
+        nx, ny, nz = grid["order"].shape
+        return index_spanwise_field({"x": numpy.repeat(grid["x"], ny), "y": grid["y"].ravel(),
+                                     "data": numpy.column_stack([average.ravel() for average, _ in averages]),
+                                     "variance": numpy.column_stack([variance.ravel() for _, variance in averages]),
+                                     "counts": numpy.full(nx * ny, nz), "data_types": list(data_types)})
+
+    xy, average, variance, counts = spanwise_average_and_variance(lethe_data[["Points_0", "Points_1"]].to_numpy(),
+                                                                  lethe_data[list(data_types)].to_numpy())
+
+    return index_spanwise_field({"x": xy[:, 0], "y": xy[:, 1], "data": average, "variance": variance,
+                                 "counts": counts, "data_types": list(data_types)})
+
+
+# Average data_types of lethe_csv in z for each unique (x, y), as compute_spanwise_field, reading the file by chunks of
+# chunksize rows (parsed by jobs processes), so the whole file is never in memory
+def compute_spanwise_field_by_chunks(lethe_csv, data_types, chunksize=streaming_chunksize, jobs=1):
+    with profile_stage("read", label=Path(lethe_csv).name):
+        chunks = read_lethe_csv(lethe_csv, usecols=["Points_0", "Points_1"] + list(data_types), chunksize=chunksize,
+                                jobs=jobs)
+        xy, average, variance, counts = spanwise_average_chunks(chunks, ["Points_0", "Points_1"], data_types)
+
+    return index_spanwise_field({"x": xy[:, 0], "y": xy[:, 1], "data": average, "variance": variance,
+                                 "counts": counts, "data_types": list(data_types)})
+
+
+# Build and save the spanwise-averaged field of all the data columns of lethe_csv
+# The field is computed by chunks if streaming is True, or if streaming is None and the file is larger than
+# streaming_file_size
+def build_spanwise_field(lethe_csv, streaming=None, jobs=1):
+    source = os.stat(lethe_csv)
+    if streaming is None:
+        streaming = source.st_size > streaming_file_size
+    if streaming:
+        field = compute_spanwise_field_by_chunks(lethe_csv, lethe_data_types(lethe_csv), jobs=jobs)
+    else:
+        field = compute_spanwise_field(lethe_csv, lethe_data_types(lethe_csv))
+
+    # Write to a temporary file and rename it, so an interrupted build is never used
+    field_file = spanwise_field_file(lethe_csv)
+    temporary_file = field_file.with_name(field_file.stem + ".tmp.npz")
+    with profile_stage("write", label=field_file.name, rows=len(field["x"])):
+        numpy.savez(temporary_file, version=field_version, source_size=source.st_size,
+                    source_mtime_ns=source.st_mtime_ns, x=field["x"], y=field["y"], data=field["data"],
+                    variance=field["variance"], counts=field["counts"], data_types=numpy.array(field["data_types"]))
+        os.replace(temporary_file, field_file)
+    print("Spanwise-averaged field of Lethe data " + str(lethe_csv) + " built (" + str(len(field["x"])) + " points)")
+
+    return field
+
+
+# Load the spanwise-averaged field of lethe_csv, None if it does not exist or is not up to date with the .csv file
+def read_spanwise_field(lethe_csv):
+    field_file = spanwise_field_file(lethe_csv)
+    if not field_file.is_file():
+        return None
+
+    key = (str(field_file.resolve()), os.stat(field_file).st_mtime_ns)
+    if key not in loaded_fields:
+        with profile_stage("read", label=field_file.name), numpy.load(field_file) as stored:
+            field = {name: stored[name] for name in stored.files}
+        field["data_types"] = [str(name) for name in field["data_types"]]
+        loaded_fields[key] = index_spanwise_field(field)
+    field = loaded_fields[key]
+
+    source = os.stat(lethe_csv)
+    if (field["version"] != field_version or field["source_size"] != source.st_size
+            or field["source_mtime_ns"] != source.st_mtime_ns):
+        return None
+
+    return field
+
+
+# Read usecols of the spanwise-averaged points of lethe_csv where lower_bound < column < upper_bound for any of the
+# bounds, as read_lethe_range does for the points of the file
+# The spanwise-averaged field is used when it is up to date and contains usecols (only Points_0 and Points_1 as
+# coordinates), otherwise the points of the file are read with read_lethe_range (parsed by jobs processes)
+def read_averaged_range(lethe_csv, usecols, column, bounds, chunksize=10000, jobs=1):
+    field = read_spanwise_field(lethe_csv)
+    field_columns = ["Points_0", "Points_1"] + (field["data_types"] if field is not None else [])
+    if field is None or column not in field_columns[:2] or any(name not in field_columns for name in usecols):
+        return read_lethe_range(lethe_csv, usecols, column, bounds, chunksize=chunksize, jobs=jobs)
+
+    values = field["x"] if column == "Points_0" else field["y"]
+    in_range = numpy.zeros(len(values), dtype=bool)
+    for lower_bound, upper_bound in bounds:
+        in_range |= (values > lower_bound) & (values < upper_bound)
+
+    field_data = {"Points_0": field["x"], "Points_1": field["y"]}
+    for k, data_type in enumerate(field["data_types"]):
+        field_data[data_type] = field["data"][:, k]
+
+    return pandas.DataFrame({name: field_data[name][in_range] for name in field_columns if name in usecols})
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    for lethe_csv in [argument for argument in sys.argv[1:] if not argument.startswith("--")]:
+        if read_spanwise_field(lethe_csv) is None:
+            build_spanwise_field(lethe_csv, streaming=True if "--streaming" in sys.argv[1:] else None)
+        else:
+            print("Spanwise-averaged field of Lethe data " + str(lethe_csv) + " is up to date")
@@ -0,0 +1,247 @@
+# Name   : stage_profiling.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Timing and memory of the stages of the post-processing scripts (read, filter, z-average, interpolate, write,
+#          plot).
+#          The shared functions run their stages in profile_stage (or are decorated with profiled_stage), which records
+#          for each stage the wall time, the CPU time, the number of rows processed, the bytes read by the process
+#          (/proc/self/io, Linux only), the peak resident memory of the process and its growth during the stage, and the
+#          peak memory allocated by python during the stage when tracemalloc is enabled. The stages nested in another
+#          stage are recorded with the name of this stage, and the calls of a stage with the same label and the same
+#          parent stage (for example for each chunk of a file, or each x/h) are summed in one record.
+#          Nothing is recorded unless profiling is enabled, with the --profile option of any script (or the
+#          STAGE_PROFILING environment variable, the folder of the reports): a report of the run is then written at the
+#          end of the script in ./profiling/<script>_<date>_<pid>.json and .csv. The options are:
+#            --profile or --profile=<folder of the reports>
+#            --trace-memory: also record the peak memory allocated by python in each stage (slower)
+#            --profile-hot or --profile-hot=pyinstrument: also profile the functions of the whole run with cProfile
+#                           (<report>.prof, and the 40 functions with the largest cumulative time in <report>_hot.txt)
+#                           or pyinstrument if it is installed (<report>_hot.html and <report>_hot.txt)
+#          The stages run by other processes (--jobs N) are not recorded.
+
+import atexit
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak resident memory is not recorded
+    resource = None
+
+# Settings of the profiling, set from the command line (or the STAGE_PROFILING environment variable) when the module
+# is imported
+profiling_settings = {"enabled": False, "folder": "./profiling/", "trace_memory": False, "hot_paths": None}
+
+# Stages recorded in this process, in the order of their first call, indexed by (name, label, parent) in stage_records,
+# and stages running (the last one is the innermost)
+profiled_stages = []
+stage_records = {}
+running_stages = []
+
+# Profiler of the hot paths, and start of the run (wall and CPU time)
+hot_path_profiler = None
+run_start = (time.perf_counter(), time.process_time())
+
+
+# Bytes read by the process since it started, None if they are not available
+def process_bytes_read():
+    try:
+        with open("/proc/self/io") as file:
+            for line in file:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+    return None
+
+
+# Peak resident memory of the process since it started (MB), None if it is not available
+def peak_rss():
+    if resource is None:
+        return None
+
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+# Fold the peak memory allocated by python since the last reset into the running stages, then reset it
+def fold_traced_peak():
+    if not tracemalloc.is_tracing():
+        return
+
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    for stage in running_stages:
+        stage["traced_peak_mb"] = max(stage["traced_peak_mb"], peak)
+    tracemalloc.reset_peak()
+
+
+# Record a stage of name in a with statement
+# label distinguishes the calls of a stage (for example the file read), rows and bytes_read can be given, or set in the
+# dictionary returned by the with statement (the bytes read by the process are recorded otherwise)
+@contextmanager
+def profile_stage(name, label="", rows=None, bytes_read=None):
+    stage = {"name": name, "label": str(label), "rows": rows, "bytes_read": bytes_read}
+    if not profiling_settings["enabled"]:
+        yield stage
+        return
+
+    fold_traced_peak()
+    stage.update({"parent": running_stages[-1]["name"] if running_stages else "", "traced_peak_mb": 0.0})
+    running_stages.append(stage)
+    start_rss = peak_rss()
+    start_bytes = process_bytes_read()
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        wall_time = time.perf_counter() - start
+        cpu_time = time.process_time() - start_cpu
+        fold_traced_peak()
+        running_stages.pop()
+
+        end_rss = peak_rss()
+        end_bytes = process_bytes_read()
+        if stage["bytes_read"] is None and start_bytes is not None and end_bytes is not None:
+            stage["bytes_read"] = end_bytes - start_bytes
+        record = {"name": name, "label": stage["label"], "parent": stage["parent"], "calls": 1,
+                  "wall_time": wall_time, "cpu_time": cpu_time, "rows": stage["rows"],
+                  "bytes_read": stage["bytes_read"], "peak_rss_mb": end_rss,
+                  "rss_growth_mb": None if end_rss is None else end_rss - start_rss,
+                  "traced_peak_mb": stage["traced_peak_mb"] if tracemalloc.is_tracing() else None}
+        add_record(record)
+
+
+# Add the record of a stage, summed with the record of the previous calls of the same stage (name, label and parent)
+def add_record(record):
+    key = (record["name"], record["label"], record["parent"])
+    last = stage_records.get(key)
+    if last is None:
+        stage_records[key] = record
+        profiled_stages.append(record)
+        return
+
+    last["calls"] += 1
+    for key in ["wall_time", "cpu_time", "rows", "bytes_read", "rss_growth_mb"]:
+        if last[key] is not None and record[key] is not None:
+            last[key] += record[key]
+        elif record[key] is not None:
+            last[key] = record[key]
+    for key in ["peak_rss_mb", "traced_peak_mb"]:
+        if record[key] is not None:
+            last[key] = record[key] if last[key] is None else max(last[key], record[key])
+
+
+# Decorator recording each call of a function as a stage of name
+# rows is a function of the result giving the number of rows processed (for example len)
+def profiled_stage(name, rows=None):
+    def decorator(function):
+        @wraps(function)
+        def profiled_function(*args, **kwargs):
+            if not profiling_settings["enabled"]:
+                return function(*args, **kwargs)
+            with profile_stage(name) as stage:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    stage["rows"] = rows(result)
+            return result
+        return profiled_function
+    return decorator
+
+
+# Start profiling: record the stages, and write the report at the end of the script
+def enable_profiling(folder="./profiling/", trace_memory=False, hot_paths=None):
+    global hot_path_profiler
+    assert hot_paths in [None, "cprofile", "pyinstrument"], "The hot paths are profiled with cprofile or pyinstrument."
+    if profiling_settings["enabled"]:
+        return
+
+    profiling_settings.update({"enabled": True, "folder": folder, "trace_memory": trace_memory,
+                               "hot_paths": hot_paths})
+    if trace_memory:
+        tracemalloc.start()
+    if hot_paths == "cprofile":
+        hot_path_profiler = cProfile.Profile()
+        hot_path_profiler.enable()
+    elif hot_paths == "pyinstrument":
+        from pyinstrument import Profiler
+        hot_path_profiler = Profiler()
+        hot_path_profiler.start()
+
+    atexit.register(write_profiling_report)
+
+
+# Prefix of the files of the report of this run (folder/<script>_<date>_<pid>)
+def report_prefix():
+    script = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "python"
+    return Path(profiling_settings["folder"]) / (script + "_" + time.strftime("%Y%m%d_%H%M%S") + "_" + str(os.getpid()))
+
+
+# Write the report of the run: the stages (.json with the description of the run, and .csv) and the hot paths
+# Returns the prefix of the files of the report
+def write_profiling_report():
+    prefix = report_prefix()
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    columns = ["name", "label", "parent", "calls", "wall_time", "cpu_time", "rows", "bytes_read", "peak_rss_mb",
+               "rss_growth_mb", "traced_peak_mb"]
+
+    report = {"script": sys.argv[0] if sys.argv else "", "arguments": sys.argv[1:],
+              "date": time.strftime("%Y-%m-%d %H:%M:%S"), "wall_time": time.perf_counter() - run_start[0],
+              "cpu_time": time.process_time() - run_start[1], "bytes_read": process_bytes_read(),
+              "peak_rss_mb": peak_rss(), "stages": profiled_stages}
+    with open(prefix.with_name(prefix.name + ".json"), "w") as file:
+        json.dump(report, file, indent=2)
+    with open(prefix.with_name(prefix.name + ".csv"), "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(profiled_stages)
+
+    if profiling_settings["hot_paths"] == "cprofile":
+        hot_path_profiler.disable()
+        hot_path_profiler.dump_stats(prefix.with_name(prefix.name + ".prof"))
+        summary = io.StringIO()
+        pstats.Stats(hot_path_profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+        prefix.with_name(prefix.name + "_hot.txt").write_text(summary.getvalue())
+    elif profiling_settings["hot_paths"] == "pyinstrument":
+        hot_path_profiler.stop()
+        prefix.with_name(prefix.name + "_hot.html").write_text(hot_path_profiler.output_html())
+        prefix.with_name(prefix.name + "_hot.txt").write_text(hot_path_profiler.output_text())
+
+    print("Profiling report saved in " + str(prefix) + ".json")
+    return prefix
+
+
+# Enable profiling from the options of the command line (see the description of the module) or the STAGE_PROFILING
+# environment variable
+def profiling_arguments():
+    arguments = sys.argv[1:]
+    folder = os.environ.get("STAGE_PROFILING")
+    hot_paths = None
+    for argument in arguments:
+        if argument == "--profile":
+            folder = "./profiling/"
+        elif argument.startswith("--profile="):
+            folder = argument[len("--profile="):]
+        elif argument == "--profile-hot":
+            hot_paths = "cprofile"
+        elif argument.startswith("--profile-hot="):
+            hot_paths = argument[len("--profile-hot="):]
+
+    if folder or hot_paths:
+        enable_profiling(folder or "./profiling/", "--trace-memory" in arguments, hot_paths)
+
+
+profiling_arguments()
@@ -0,0 +1,66 @@
+# Name   : structured_grid.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Detection of the structured grid of the Lethe data and reshaping of the points into (nx, ny, nz) arrays.
+#          The periodic hills meshes are extruded in z from a 2D mesh where the points of each x plane are on the same
+#          vertical line: the points are then a tensor product of nx x values, ny y values per x value (following the
+#          hill) and nz z values. When the points of a Lethe file have this structure, they are sorted once by (x, y, z)
+#          and each column is reshaped into a (nx, ny, nz) array, so the z average of the spanwise-averaged field (see
+#          spanwise_field.py) is a mean over the last axis, instead of grouping the points by (x, y). The coordinates are
+#          compared by bins of coordinate_tolerance (see coordinate_binning.py), so the points written with round-off
+#          errors are still on the grid.
+
+import numpy
+
+from coordinate_binning import coordinate_bins
+from stage_profiling import profiled_stage
+
+
+# Order of the points (x, y, z) in a structured grid
+# Returns a (nx, ny, nz) array with the index of the point at each (i, j, k), the points being sorted by x along i, by y
+# along j and by z along k, or None if the points are not a tensor product of x, y (for each x) and z values
+def structured_grid_order(x, y, z):
+    x_keys, x_index = coordinate_bins(x)
+    z_keys, z_index = coordinate_bins(z)
+    if len(x_index) == 0 or len(x_index) % (len(x_keys) * len(z_keys)) != 0:
+        return None
+    _, y_index = coordinate_bins(y)
+
+    order = numpy.lexsort((z_index, y_index, x_index)).reshape(len(x_keys), -1, len(z_keys))
+    x_grid = x_index[order]
+    y_grid = y_index[order]
+    z_grid = z_index[order]
+
+    # Each x plane has the same number of points, each y value of the plane has every z value and the y values of a
+    # plane are unique
+    if not ((x_grid == numpy.arange(len(x_keys))[:, None, None]).all()
+            and (z_grid == numpy.arange(len(z_keys))[None, None, :]).all()
+            and (y_grid == y_grid[:, :, :1]).all() and (numpy.diff(y_grid[:, :, 0], axis=1) > 0).all()):
+        return None
+
+    return order
+
+
+# Reshape the points (x, y, z) and the data (a dictionary of arrays with one value per point) on their structured grid
+# Returns a dictionary with the x values (nx), the y values of each x plane (nx, ny), the z values (nz), the index of the
+# point at each (i, j, k) ("order") and a (nx, ny, nz) array for each data type, or None if the points are not structured
+def structured_grid(x, y, z, data):
+    order = structured_grid_order(x, y, z)
+    if order is None:
+        return None
+
+    # The coordinates of a grid line are the smallest values of its points, as in coordinate_groups
+    grid = {"x": numpy.asarray(x)[order].min(axis=(1, 2)), "y": numpy.asarray(y)[order].min(axis=2),
+            "z": numpy.asarray(z)[order].min(axis=(0, 1)), "order": order}
+    for name, values in data.items():
+        grid[name] = numpy.asarray(values, dtype=float)[order]
+
+    return grid
+
+
+# Average and variance in z of a data type of the grid, (nx, ny) arrays
+@profiled_stage("z-average")
+def grid_spanwise_average(grid, data_type):
+    average = grid[data_type].mean(axis=2)
+    variance = ((grid[data_type] - average[:, :, None]) ** 2).mean(axis=2)
+    return average, variance
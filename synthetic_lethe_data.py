@@ -0,0 +1,225 @@
+# Name   : synthetic_lethe_data.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Generator of synthetic Lethe data of the periodic hills case, for benchmarks of the post-processing scripts
+#          without the real simulation data.
+#          The files have the format of the .csv files exported from paraview (Points_0, Points_1, Points_2 and the
+#          average_*, reynolds_* and turbulent_kinetic_energy columns of Lethe) and their points are on the periodic
+#          hills geometry (hill_geometry.py, x/h in [0, 9], y/h from the lower wall to the upper wall, z/h in [0, 4.5]).
+#          Two kinds of grids are available:
+#            * "structured": nx x planes, ny points per x plane following the hill (clustered at both walls) and nz
+#              z planes, as the meshes extruded in z (see structured_grid.py),
+#            * "adaptive": a mesh refined once around the hills (x/h < 1.93 and x/h > 7.07), where the x planes are
+#              twice as close and have twice as many points, with about the same number of points.
+#          The fields are a smooth model of the flow (recirculation bubble behind the hill, shear layer at the height of
+#          the crest) with a random fluctuation in z, so the z averages, the near-wall data and the reattachment point
+#          are computed on realistic data. The points are shuffled by blocks as in the files written by several
+#          processes, and a fraction of the coordinates can be shifted by a round-off error (as written by another
+#          process). The file is written by blocks of x planes, so meshes larger than the memory can be generated, and
+#          the same arguments always give the same file.
+#
+#          To generate files: python synthetic_lethe_data.py 120K 4M (sizes of synthetic_meshes)
+#          Options: --grid adaptive, --Re 10600, --columns profiles, --round-off 0.01, --folder ./lethe_data/
+
+import sys
+from pathlib import Path
+
+import numpy
+import pandas
+
+from hill_geometry import channel_height, wall_height_and_slope
+
+########################################################################################################################
+# SET VARIABLES
+
+# Path to folder where the synthetic Lethe data is written
+path_to_lethe_data = "./lethe_data/"
+
+# Number of points (nx, ny, nz) of the structured synthetic meshes, indexed by size
+synthetic_meshes = {"120K": (120, 50, 20), "500K": (160, 80, 40), "1M": (200, 100, 50), "4M": (320, 160, 80),
+                    "16M": (512, 250, 125), "64M": (800, 400, 200)}
+
+# Columns of the synthetic files: the columns used by the post-processing scripts ("profiles") or all the columns of
+# the average data exported from Lethe ("full")
+synthetic_columns = {
+    "profiles": ["average_velocity_0", "average_velocity_1", "reynolds_normal_stress_0", "reynolds_normal_stress_1",
+                 "reynolds_normal_stress_2", "reynolds_shear_stress_uv", "turbulent_kinetic_energy"],
+    "full": ["average_velocity_0", "average_velocity_1", "average_velocity_2", "average_pressure",
+             "reynolds_normal_stress_0", "reynolds_normal_stress_1", "reynolds_normal_stress_2",
+             "reynolds_shear_stress_uv", "reynolds_shear_stress_vw", "reynolds_shear_stress_uw",
+             "turbulent_kinetic_energy"],
+}
+
+# Length of the domain in x and z (x/h, z/h)
+domain_length = 9.0
+domain_width = 4.5
+
+# Separation and reattachment points (x/h) of the recirculation bubble of the model
+separation = 0.2
+reattachment = 4.7
+
+# Number of points written at once
+block_size = 1000000
+
+########################################################################################################################
+
+
+# y/h of ny points between the lower wall at each x (x/h) and the upper wall, clustered at both walls
+# Returns an array of shape (len(x), ny)
+def wall_clustered_y(x, ny):
+    wall, _ = wall_height_and_slope(x)
+    eta = 0.5 * (1 + numpy.tanh(2.0 * numpy.linspace(-1, 1, ny)) / numpy.tanh(2.0))
+    return wall[:, None] + (channel_height - wall[:, None]) * eta[None, :]
+
+
+# x planes of a grid and their number of points in y, for a grid of size (nx, ny, nz)
+def grid_planes(nx, ny, grid):
+    assert grid in ["structured", "adaptive"], "The grid must be structured or adaptive."
+    if grid == "structured":
+        return numpy.linspace(0, domain_length, nx), numpy.full(nx, ny)
+
+    # The refined region has twice as many x planes, with twice as many points, for about the same number of points
+    refined_length = 2 * 1.93
+    scale = numpy.sqrt(1 + 3 * refined_length / domain_length)
+    coarse_x = numpy.linspace(0, domain_length, max(2, int(round(nx / scale))))
+    refined_x = numpy.linspace(0, domain_length, 2 * len(coarse_x) - 1)
+    refined = (refined_x < 1.93) | (refined_x > domain_length - 1.93)
+    x_planes = numpy.union1d(coarse_x, refined_x[refined])
+    ny_coarse = max(2, int(round(ny / scale)))
+    in_refined = (x_planes <= 1.93) | (x_planes >= domain_length - 1.93)
+    return x_planes, numpy.where(in_refined, 2 * ny_coarse - 1, ny_coarse)
+
+
+# Model of the average flow at the points (x, y) (x/h, y/h) for the Reynolds number Re
+# Returns a dictionary with the value of each column of columns at each point
+def flow_model(x, y, Re, columns):
+    wall, slope = wall_height_and_slope(x)
+    distance = numpy.maximum(y - wall, 0)
+    eta = numpy.clip(distance / (channel_height - wall), 0, 1)
+
+    # Turbulent channel profile, reversed near the wall in the recirculation bubble
+    bubble = numpy.where((x > separation) & (x < reattachment),
+                         numpy.sin(numpy.pi * (x - separation) / (reattachment - separation)), 0)
+    thickness = 0.35 * (5600 / Re) ** 0.2
+    u = 1.15 * (4 * eta * (1 - eta)) ** (1 / 7) * (1 - 1.4 * bubble * numpy.exp(-distance / thickness))
+    v = u * slope * (1 - eta)
+
+    # Reynolds stresses peaking in the shear layer at the height of the crest, zero at the walls
+    shear_layer = numpy.exp(-((y - 1.0) / (0.25 + 0.08 * x)) ** 2) * numpy.exp(-x / 8)
+    damping = (1 - numpy.exp(-distance / 0.02)) * (1 - numpy.exp(-(channel_height - y) / 0.02))
+    uu = (0.005 + 0.06 * shear_layer) * damping
+    vv = (0.002 + 0.03 * shear_layer) * damping
+    ww = (0.003 + 0.04 * shear_layer) * damping
+    uv = -0.02 * shear_layer * damping
+
+    model = {"average_velocity_0": u, "average_velocity_1": v, "average_velocity_2": numpy.zeros_like(u),
+             "average_pressure": 0.5 * (1.15 ** 2 - u ** 2), "reynolds_normal_stress_0": uu,
+             "reynolds_normal_stress_1": vv, "reynolds_normal_stress_2": ww, "reynolds_shear_stress_uv": uv,
+             "reynolds_shear_stress_vw": 0.05 * uv, "reynolds_shear_stress_uw": 0.05 * uv,
+             "turbulent_kinetic_energy": 0.5 * (uu + vv + ww)}
+    assert all(column in model for column in columns), "The columns must be in " + str(list(model)) + "."
+
+    return {column: model[column] for column in columns}
+
+
+# Block of points of a grid: the points of the x planes x_planes with ny_planes points in y each and z values z
+# The data is the flow model with a random relative fluctuation of size noise, rng giving the random numbers
+def grid_block(x_planes, ny_planes, z, Re, columns, noise, rng):
+    x = numpy.repeat(x_planes, ny_planes)
+    y = numpy.concatenate([wall_clustered_y(x_planes[i:i + 1], ny)[0] for i, ny in enumerate(ny_planes)])
+    model = flow_model(x, y, Re, columns)
+
+    block = {"Points_0": numpy.repeat(x, len(z)), "Points_1": numpy.repeat(y, len(z)),
+             "Points_2": numpy.tile(z, len(x))}
+    for column in columns:
+        # The fluctuation is relative, so the data is still zero at the walls and the normal stresses are positive
+        values = numpy.repeat(model[column], len(z))
+        block[column] = values * (1 + noise * rng.standard_normal(len(values)))
+
+    return pandas.DataFrame(block)
+
+
+# Name of the synthetic file of a mesh size, grid, Reynolds number, columns and fraction of coordinates with a round-off
+# error, so a file generated with other arguments is never reused
+def synthetic_file_name(size, grid="structured", Re=5600, columns="full", round_off=0.0):
+    round_off_name = "_round_off_" + repr(float(round_off)) if round_off > 0 else ""
+    return "synthetic_" + grid + "_" + size + "_" + str(Re) + "_" + columns + round_off_name + ".csv"
+
+
+# Write a synthetic Lethe .csv file of n_points = (nx, ny, nz) points (for a structured grid)
+# The points are shuffled by blocks, a fraction round_off of the coordinates are shifted by a round-off error and the
+# data has a random fluctuation of size noise in z, seed giving the random numbers
+def write_synthetic_lethe_csv(lethe_csv, n_points, grid="structured", Re=5600, columns="full", noise=0.02,
+                              round_off=0.0, seed=0):
+    assert columns in synthetic_columns, "The columns must be one of " + str(list(synthetic_columns)) + "."
+    nx, ny, nz = n_points
+    x_planes, ny_planes = grid_planes(nx, ny, grid)
+    z = numpy.linspace(0, domain_width, nz)
+
+    # Blocks of x planes of about block_size points
+    plane_sizes = ny_planes * nz
+    block_index = numpy.cumsum(plane_sizes) // block_size
+    n_rows = 0
+
+    # Write to a temporary file and rename it, so an interrupted generation never looks like a Lethe file
+    lethe_csv = Path(lethe_csv)
+    lethe_csv.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file = lethe_csv.with_name(lethe_csv.name + ".tmp")
+    with open(temporary_file, "w") as file:
+        for i, index in enumerate(numpy.unique(block_index)):
+            rng = numpy.random.default_rng([seed, i])
+            planes = block_index == index
+            block = grid_block(x_planes[planes], ny_planes[planes], z, Re, synthetic_columns[columns], noise, rng)
+            block = block.iloc[rng.permutation(len(block))]
+
+            if round_off > 0:
+                for coordinate in ["Points_0", "Points_1", "Points_2"]:
+                    shifted = rng.random(len(block)) < round_off
+                    values = block[coordinate].to_numpy(copy=True)
+                    values[shifted] = values[shifted] * (1 + 4 * numpy.finfo(float).eps) + 1e-15
+                    block[coordinate] = values
+
+            block.to_csv(file, index=False, header=(i == 0))
+            n_rows += len(block)
+
+    temporary_file.replace(lethe_csv)
+    print("Synthetic Lethe data " + str(lethe_csv) + " written (" + str(n_rows) + " rows)")
+
+    return n_rows
+
+
+# Path of the synthetic file of a size of synthetic_meshes in folder, written if it does not exist
+def synthetic_lethe_file(folder, size, grid="structured", Re=5600, columns="full", round_off=0.0):
+    assert size in synthetic_meshes, "The size must be one of " + str(list(synthetic_meshes)) + "."
+    lethe_csv = Path(folder) / synthetic_file_name(size, grid, Re, columns, round_off)
+    if not lethe_csv.is_file():
+        write_synthetic_lethe_csv(lethe_csv, synthetic_meshes[size], grid, Re, columns, round_off=round_off)
+
+    return lethe_csv
+
+
+# Value of the option name of the command line, default if it is not given
+def option_argument(name, default):
+    arguments = sys.argv[1:]
+    for i, argument in enumerate(arguments):
+        if argument.startswith(name + "="):
+            return argument[len(name) + 1:]
+        if argument == name and i + 1 < len(arguments):
+            return arguments[i + 1]
+
+    return default
+
+
+########################################################################################################################
+# RUN FUNCTIONS
+
+if __name__ == "__main__":
+    grid = option_argument("--grid", "structured")
+    Re = int(option_argument("--Re", 5600))
+    columns = option_argument("--columns", "full")
+    round_off = float(option_argument("--round-off", 0.0))
+    folder = option_argument("--folder", path_to_lethe_data)
+    sizes = [argument for argument in sys.argv[1:] if argument in synthetic_meshes] or ["120K"]
+    for size in sizes:
+        lethe_csv = Path(folder) / synthetic_file_name(size, grid, Re, columns, round_off)
+        write_synthetic_lethe_csv(lethe_csv, synthetic_meshes[size], grid, Re, columns, round_off=round_off)
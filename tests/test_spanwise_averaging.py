@@ -0,0 +1,73 @@
+# Name   : test_spanwise_averaging.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Tests of the spanwise averaging by chunks of spanwise_averaging.py: the averages and variances of the chunks
+#          match the ones of the whole data, and the merges of the accumulators of many chunks group a number of keys
+#          that grows linearly with the number of chunks (the chunks of a file sorted by x contain few (x, y) keys each).
+#          To run the tests:  python -m pytest -q tests
+
+import os
+import sys
+
+import numpy
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import spanwise_averaging
+
+
+# Function to build a dataframe of points on n_x x planes, n_y y values and n_z z planes, sorted by x then y, with a
+# round-off error on the coordinates
+def sorted_points(n_x, n_y, n_z, seed=0):
+    generator = numpy.random.default_rng(seed)
+    x, y, z = numpy.meshgrid(numpy.linspace(0, 9, n_x), numpy.linspace(0, 3, n_y), numpy.linspace(0, 4.5, n_z),
+                             indexing="ij")
+    points = pandas.DataFrame({"x": x.ravel(), "y": y.ravel(), "z": z.ravel()})
+    points[["x", "y"]] += generator.uniform(-1e-12, 1e-12, (len(points), 2))
+    points["u"] = numpy.sin(points["x"]) + generator.normal(0, 0.1, len(points))
+    points["v"] = points["y"] * generator.normal(1, 0.2, len(points))
+    return points
+
+
+# Function to split a dataframe in chunks of chunksize rows, as pandas.read_csv with a chunksize
+def chunks_of(points, chunksize):
+    for start in range(0, len(points), chunksize):
+        yield points.iloc[start:start + chunksize]
+
+
+def test_chunks_match_whole_data():
+    points = sorted_points(40, 25, 8)
+    keys, average, variance, counts = spanwise_averaging.spanwise_average_chunks(chunks_of(points, 333), ["x", "y"],
+                                                                                 ["u", "v"])
+    expected = spanwise_averaging.spanwise_average_and_variance(points[["x", "y"]].to_numpy(),
+                                                                points[["u", "v"]].to_numpy())
+
+    assert len(keys) == 40 * 25
+    numpy.testing.assert_allclose(keys, expected[0])
+    numpy.testing.assert_allclose(average, expected[1])
+    numpy.testing.assert_allclose(variance, expected[2], atol=1e-12)
+    numpy.testing.assert_array_equal(counts, expected[3])
+
+
+def test_merges_grow_linearly_with_chunks(monkeypatch):
+    merged_keys = []
+    merge = spanwise_averaging._merge_spanwise_accumulators
+
+    def counted_merge(accumulators):
+        merged_keys.append(sum(len(part["keys"]) for part in accumulators))
+        return merge(accumulators)
+
+    monkeypatch.setattr(spanwise_averaging, "_merge_spanwise_accumulators", counted_merge)
+
+    # 2000 chunks of 5 (x, y) keys each: merging the accumulator with every chunk would group about
+    # 2000 * 10000 / 2 = 1e7 keys
+    n_chunks = 2000
+    points = sorted_points(400, 25, 4)
+    keys, _, _, counts = spanwise_averaging.spanwise_average_chunks(chunks_of(points, len(points) // n_chunks),
+                                                                    ["x", "y"], ["u", "v"])
+
+    assert len(keys) == 400 * 25
+    assert numpy.all(counts == 4)
+    assert len(merged_keys) < n_chunks / 50
+    assert sum(merged_keys) <= 4 * len(keys)
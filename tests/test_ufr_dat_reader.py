@@ -0,0 +1,30 @@
+# Name   : test_ufr_dat_reader.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Tests of the reader of the UFR 3-30 .dat files of ufr_dat_reader.py on the files of lit/: the Reynolds number
+#          of the header is read with its thousands separator (Breuer2009, Re = 10,595) or without (Rapp2009).
+#          To run the tests:  python -m pytest -q tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ufr_dat_reader
+
+lit_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lit")
+
+
+def test_reynolds_with_thousands_separator():
+    dat_file = os.path.join(lit_folder, "Re_10600", "Breuer2009_UFR3-30", "UFR3-30_C_10595_data_MB-003.dat")
+    assert ufr_dat_reader.read_ufr_dat(dat_file)["Re"] == 10595
+
+
+def test_reynolds_without_separator():
+    dat_file = os.path.join(lit_folder, "Re_37000", "Rapp2009_UFR3-30", "UFR3-30_X_37000_data_CR-001.dat")
+    assert ufr_dat_reader.read_ufr_dat(dat_file)["Re"] == 37000
+
+
+def test_header_thousands_separator():
+    _, _, reynolds = ufr_dat_reader.parse_ufr_dat_header([" Case        : 9   (Re = 10,595, LES) "])
+    assert reynolds == 10595
@@ -0,0 +1,86 @@
+# Name   : ufr_dat_reader.py
+# Author : Laura Prieto Saavedra
+# Date   : 18-10-2026
+# Desc   : Reader of the original ERCOFTAC UFR 3-30 .dat files (lit/Re_*/Rapp2009_UFR3-30/*.dat and
+#          lit/Re_*/Breuer2009_UFR3-30/*.dat).
+#          The files start with a header of comment lines (#) and the data block follows, with the values separated
+#          by commas (Rapp2009) or spaces (Breuer2009). The header gives the names of the columns (the comment line
+#          starting with y/h, separated by ; or spaces), the x/h of the profile (Rapp2009 only, # x/h=0.5) and the
+#          Reynolds number. The data block is split and converted to a numpy array at once, without pandas, and the
+#          columns are named with the Lethe data types when they are known, so new fields and new Re cases are read
+#          without converting the files by hand.
+#          The files read are kept in memory with their size and modification time, and read again only if they are
+#          modified. literature_database.py saves them in the literature database.
+
+import os
+import re
+from pathlib import Path
+
+import numpy
+
+# Lethe data type of the columns of the UFR 3-30 .dat files (Rapp2009 and Breuer2009 names)
+ufr_dat_columns = {"u/u_b": "average_velocity_0", "U/Ubulk": "average_velocity_0",
+                   "v/u_b": "average_velocity_1", "V/Ubulk": "average_velocity_1",
+                   "u'u'/u_b^2": "reynolds_normal_stress_0", "uu/Ubulk^2": "reynolds_normal_stress_0",
+                   "v'v'/u_b^2": "reynolds_normal_stress_1", "vv/Ubulk^2": "reynolds_normal_stress_1",
+                   "w'w'/u_b^2": "reynolds_normal_stress_2", "ww/Ubulk^2": "reynolds_normal_stress_2",
+                   "u'v'/u_b^2": "reynolds_shear_stress_uv", "uv/Ubulk^2": "reynolds_shear_stress_uv",
+                   "k/u_b^2": "turbulent_kinetic_energy", "k/Ubulk^2": "turbulent_kinetic_energy"}
+
+# Files already read, indexed by file path: ((size, modification time), parsed file)
+loaded_dat_files = {}
+
+
+# Parse the header lines (without #) of a UFR 3-30 .dat file
+# Returns the names of the columns, the x/h of the profile and the Reynolds number (None if they are not given)
+def parse_ufr_dat_header(header):
+    columns = None
+    x_value = None
+    reynolds = None
+    for line in header:
+        line = line.strip()
+        if line.startswith("y/h"):
+            columns = [name for name in re.split(r"[;\s]+", line) if name]
+        elif line.replace(" ", "").startswith("x/h="):
+            x_value = float(line.replace(" ", "")[len("x/h="):])
+        # The Reynolds number can be written with a thousands separator (Re = 10,595)
+        match = re.search(r"Re *= *([0-9][0-9,]*)", line)
+        if match is not None and reynolds is None:
+            reynolds = int(match.group(1).replace(",", ""))
+
+    return columns, x_value, reynolds
+
+
+# Read a UFR 3-30 .dat file
+# Returns a dictionary with the names of the columns as in the file ("columns"), their Lethe data types (the name of
+# the column if it is not known, "fields"), the x/h of the profile ("x_value"), the Reynolds number ("Re") and the data
+# ("data", array of shape (n, number of columns), the first column being y/h)
+def read_ufr_dat(dat_file):
+    source = os.stat(dat_file)
+    key = str(Path(dat_file).resolve())
+    if key in loaded_dat_files and loaded_dat_files[key][0] == (source.st_size, source.st_mtime_ns):
+        return loaded_dat_files[key][1]
+
+    with open(dat_file, "rb") as file:
+        content = file.read()
+
+    # The header is the comment lines at the start of the file, the data block starts at the first other line
+    header = []
+    start = 0
+    while start < len(content) and content[start:start + 1] in [b"#", b"\n", b"\r"]:
+        end = content.find(b"\n", start)
+        end = len(content) if end == -1 else end + 1
+        header.append(content[start:end].decode("latin-1").lstrip("#"))
+        start = end
+
+    columns, x_value, reynolds = parse_ufr_dat_header(header)
+    assert columns is not None, "The header of " + str(dat_file) + " does not give the names of the columns."
+
+    # The values are separated by commas or spaces, the whole data block is split and converted at once
+    values = numpy.array(content[start:].replace(b",", b" ").split()).astype(float)
+    assert len(values) % len(columns) == 0, "The data block of " + str(dat_file) + " does not match its columns."
+
+    ufr_dat = {"columns": columns, "fields": [ufr_dat_columns.get(name, name) for name in columns],
+               "x_value": x_value, "Re": reynolds, "data": values.reshape(-1, len(columns))}
+    loaded_dat_files[key] = ((source.st_size, source.st_mtime_ns), ufr_dat)
+    return ufr_dat
@@ -10,6 +10,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.interpolate import lagrange
+from lethe_cache import read_lethe_dataframe
 
 ############################# FILL OUT THIS PART #################################
 # Reynolds number of the simulation (Currently available for Re = 5600 only)
@@ -55,7 +56,7 @@ x_per_file = []
 # Reading Lethe data and sort them by x values
 for file_nb, lethe_file in enumerate(file_names_lethe_data):
     lethe_csv = path_to_lethe_data + lethe_file + ".csv"
-    lethe_data = pd.read_csv(lethe_csv, usecols=["Points_0", "Points_1", "average_velocity_0"], sep=",").sort_values(
+    lethe_data = read_lethe_dataframe(lethe_csv, usecols=["Points_0", "Points_1", "average_velocity_0"]).sort_values(
         "Points_0")
 
     u_values = []